@@ -1,32 +1,576 @@
 #!/usr/bin/env python3
+import argparse
+import asyncio
+import bisect
+import csv
 import datetime as dt
+import gzip
+import hashlib
+import io
 import json
+import logging
+import mimetypes
+import mmap
 import os
+import queue
 import re
+import select
+import signal
+import socket
 import sqlite3
+import sys
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
 from http import HTTPStatus
-from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
-from urllib.parse import parse_qs, urlparse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlparse
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-DB_PATH = os.path.join(BASE_DIR, "restaurant.db")
+DB_PATH = os.environ.get("POS_DB_PATH", os.path.join(BASE_DIR, "restaurant.db"))
+ARCHIVE_DB_PATH = os.environ.get("POS_ARCHIVE_DB_PATH", os.path.splitext(DB_PATH)[0] + "-archive.db")
 STATIC_DIR = os.path.join(BASE_DIR, "static")
 
+DB_POOL_SIZE = int(os.environ.get("POS_DB_POOL_SIZE", "16"))
+DB_SYNCHRONOUS = os.environ.get("POS_DB_SYNCHRONOUS", "NORMAL").upper()
+DB_CACHE_SIZE = int(os.environ.get("POS_DB_CACHE_SIZE", "-16000"))
+DB_MMAP_SIZE = int(os.environ.get("POS_DB_MMAP_SIZE", str(64 * 1024 * 1024)))
+DB_BUSY_TIMEOUT_MS = int(os.environ.get("POS_DB_BUSY_TIMEOUT_MS", "5000"))
+
+# Opt-in: statements slower than this many milliseconds are logged with their plan.
+SLOW_QUERY_MS = float(os.environ["POS_SLOW_QUERY_MS"]) if os.environ.get("POS_SLOW_QUERY_MS") else None
+SLOW_QUERY_PROGRESS_STEPS = 1000
+
+SERVER_MODE = os.environ.get("POS_SERVER_MODE", "threading")
+ASYNC_WORKERS = int(os.environ.get("POS_ASYNC_WORKERS", "16"))
+# Each open stream (kitchen SSE, export) holds one of these threads for its
+# whole lifetime; once all are busy further stream requests get 503 instead
+# of queueing behind them. A disconnected client frees its thread at the next
+# heartbeat. Raise it for more concurrent kitchen screens.
+ASYNC_STREAM_WORKERS = int(os.environ.get("POS_ASYNC_STREAM_WORKERS", "64"))
+ASYNC_KEEPALIVE_SECONDS = float(os.environ.get("POS_ASYNC_KEEPALIVE_SECONDS", "15"))
+ASYNC_MAX_BODY_BYTES = 1024 * 1024
+ASYNC_DRAIN_THRESHOLD = 64 * 1024
+
+RESPONSE_CACHE_ENABLED = os.environ.get("POS_RESPONSE_CACHE", "1") != "0"
+
+STATIC_MAX_AGE = int(os.environ.get("POS_STATIC_MAX_AGE", "0"))
+STATIC_RESCAN_SECONDS = 2.0
+STATIC_GZIP_MIN_BYTES = 512
+
+WRITE_BATCH_MAX = int(os.environ.get("POS_WRITE_BATCH_MAX", "64"))
+WRITE_BATCH_WINDOW_MS = float(os.environ.get("POS_WRITE_BATCH_WINDOW_MS", "0"))
+
+WORKERS = int(os.environ.get("POS_WORKERS", "1"))
+WORKER_GRACEFUL_SECONDS = float(os.environ.get("POS_WORKER_GRACEFUL_SECONDS", "10"))
+WORKER_READY_TIMEOUT = 10
+WORKER_RESPAWN_DELAY = 1.0
+
+EXPORT_BATCH_ROWS = 500
+ARCHIVE_BATCH_ORDERS = 500
+
+KITCHEN_STREAM_HEARTBEAT_SECONDS = 15
+KITCHEN_STREAM_QUEUE_SIZE = 256
+KITCHEN_STREAM_REMOTE_POLL_SECONDS = 0.25
+
 
 def now_iso():
     return dt.datetime.now().replace(microsecond=0).isoformat()
 
 
+_request_context = threading.local()
+
+
+def current_handler():
+    return getattr(_request_context, "handler", None) or threading.current_thread().name
+
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "total", "count")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+
+def _labels(**labels):
+    def escape(value):
+        return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", " ")
+
+    return "{" + ",".join(f'{name}="{escape(value)}"' for name, value in labels.items()) + "}"
+
+
+class Metrics:
+    """Process-local request/SQLite counters rendered in Prometheus text format."""
+
+    LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+    QUERY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.1, 0.5)
+    SIZE_BUCKETS = (128, 512, 2048, 8192, 32768, 131072, 524288, 2097152)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._requests = {}
+        self._latency = {}
+        self._response_bytes = {}
+        self._queries = {}
+        self._gauges = {}
+        # Set to {"worker": slot} in pre-fork workers; every series carries it.
+        self.const_labels = {}
+
+    def observe_request(self, route, method, status, seconds, size):
+        with self._lock:
+            key = (route, method, status)
+            self._requests[key] = self._requests.get(key, 0) + 1
+            key = (route, method)
+            latency = self._latency.get(key)
+            if latency is None:
+                latency = self._latency[key] = Histogram(self.LATENCY_BUCKETS)
+                self._response_bytes[key] = Histogram(self.SIZE_BUCKETS)
+            latency.observe(seconds)
+            if size is not None:
+                self._response_bytes[key].observe(size)
+
+    def observe_query(self, handler, seconds):
+        with self._lock:
+            histogram = self._queries.get(handler)
+            if histogram is None:
+                histogram = self._queries[handler] = Histogram(self.QUERY_BUCKETS)
+            histogram.observe(seconds)
+
+    def gauge(self, name, help_text):
+        """Register a callable sampled at scrape time."""
+
+        def decorator(sample):
+            self._gauges[name] = (help_text, sample)
+            return sample
+
+        return decorator
+
+    @staticmethod
+    def _render_histogram(lines, name, help_text, series):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} histogram")
+        for labels, histogram in series:
+            cumulative = 0
+            for bound, count in zip(histogram.buckets + ("+Inf",), histogram.counts):
+                cumulative += count
+                lines.append(f"{name}_bucket{_labels(**labels, le=bound)} {cumulative}")
+            lines.append(f"{name}_sum{_labels(**labels)} {histogram.total:.6f}")
+            lines.append(f"{name}_count{_labels(**labels)} {histogram.count}")
+
+    def render(self):
+        lines = [
+            "# HELP pos_http_requests_total HTTP requests by route template, method and status.",
+            "# TYPE pos_http_requests_total counter",
+        ]
+        with self._lock:
+            for (route, method, status), count in sorted(self._requests.items()):
+                labels = _labels(**self.const_labels, route=route, method=method, status=status)
+                lines.append(f"pos_http_requests_total{labels} {count}")
+            self._render_histogram(
+                lines,
+                "pos_http_request_duration_seconds",
+                "Time from dispatch until the response was handed to the socket.",
+                [
+                    ({**self.const_labels, "route": route, "method": method}, histogram)
+                    for (route, method), histogram in sorted(self._latency.items())
+                ],
+            )
+            self._render_histogram(
+                lines,
+                "pos_http_response_bytes",
+                "Response body size (Content-Length) by route.",
+                [
+                    ({**self.const_labels, "route": route, "method": method}, histogram)
+                    for (route, method), histogram in sorted(self._response_bytes.items())
+                ],
+            )
+            self._render_histogram(
+                lines,
+                "pos_sqlite_query_duration_seconds",
+                "SQLite statement execution time by request handler.",
+                [
+                    ({**self.const_labels, "handler": handler}, histogram)
+                    for handler, histogram in sorted(self._queries.items())
+                ],
+            )
+
+        gauge_labels = _labels(**self.const_labels) if self.const_labels else ""
+        for name, (help_text, sample) in sorted(self._gauges.items()):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name}{gauge_labels} {sample()}")
+        return "\n".join(lines) + "\n"
+
+
+METRICS = Metrics()
+
+
+@METRICS.gauge("pos_threads", "Live Python threads in this process.")
+def _sample_threads():
+    return threading.active_count()
+
+
+class SlowQueryLog:
+    """Logs statements slower than SLOW_QUERY_MS with their EXPLAIN QUERY PLAN.
+
+    Plans are captured once per SQL text and scanned for full table scans,
+    correlated subqueries and temporary sort b-trees; the SQL itself is
+    checked for comparisons on function-wrapped columns such as
+    ``date(closed_at) = ?``, which keep SQLite from using an index on the
+    column. All of these are reported as flags next to the plan.
+    """
+
+    SKIP_PLAN_PREFIXES = ("BEGIN", "COMMIT", "ROLLBACK", "SAVEPOINT", "RELEASE", "PRAGMA", "ANALYZE")
+    AGGREGATES = {"count", "sum", "total", "min", "max", "avg", "group_concat"}
+    FUNCTION_FILTER = re.compile(
+        r"\b(\w+)\s*\(([^()]*)\)\s*(?:[=<>!]|(?:NOT\s+)?(?:BETWEEN|IN|LIKE|GLOB|IS)\b)", re.IGNORECASE
+    )
+    COLUMN = re.compile(r"(?:\w+\.)?[A-Za-z_]\w*")
+
+    def __init__(self):
+        self.logger = logging.getLogger("pos.slow_query")
+        self._plans = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def params_shape(parameters, many=False):
+        if many:
+            rows = list(parameters)
+            return {"rows": len(rows), "row": SlowQueryLog.params_shape(rows[0]) if rows else []}
+        if isinstance(parameters, dict):
+            return {name: type(value).__name__ for name, value in parameters.items()}
+        return [type(value).__name__ for value in parameters]
+
+    @classmethod
+    def plan_flags(cls, plan, sql=""):
+        flags = []
+        for line in plan:
+            # SQLite before 3.36 wrote "SCAN TABLE orders" instead of "SCAN orders".
+            target = line[5:].removeprefix("TABLE ")
+            if line.startswith("SCAN ") and " USING " not in line and target != "CONSTANT ROW":
+                flags.append(f"full-scan:{target.split()[0]}")
+            elif line.startswith("CORRELATED "):
+                flags.append("correlated-subquery")
+            elif line.startswith("USE TEMP B-TREE"):
+                flags.append("temp-b-tree")
+        for name, args in cls.FUNCTION_FILTER.findall(sql):
+            if name.lower() in cls.AGGREGATES:
+                continue
+            columns = [arg.strip() for arg in args.split(",") if cls.COLUMN.fullmatch(arg.strip())]
+            if columns:
+                flags.append(f"function-on-column:{name}({columns[0]})")
+        return flags
+
+    def plan(self, conn, sql, parameters):
+        normalized = sql.strip()
+        if normalized.upper().startswith(self.SKIP_PLAN_PREFIXES):
+            return [], []
+        with self._lock:
+            cached = self._plans.get(normalized)
+        if cached is not None:
+            return cached
+        try:
+            rows = sqlite3.Connection.execute(conn, "EXPLAIN QUERY PLAN " + normalized, parameters).fetchall()
+        except sqlite3.Error as exc:
+            return [f"(plan alınamadı: {exc})"], []
+        plan = [row[3] for row in rows]
+        cached = (plan, self.plan_flags(plan, normalized))
+        with self._lock:
+            self._plans[normalized] = cached
+        return cached
+
+    def report(self, conn, sql, parameters, seconds, many=False, vm_ticks=0, runs=0):
+        rows = list(parameters) if many else None
+        plan, flags = self.plan(conn, sql, rows[0] if many and rows else ([] if many else parameters))
+        record = {
+            "handler": current_handler(),
+            "duration_ms": round(seconds * 1000, 3),
+            "sql": " ".join(sql.split()),
+            "params": self.params_shape(rows if many else parameters, many),
+            "vm_steps": vm_ticks * SLOW_QUERY_PROGRESS_STEPS,
+            "statement_runs": runs,
+            "plan": plan,
+            "flags": flags,
+        }
+        self.logger.warning("slow query %s", json.dumps(record, ensure_ascii=False))
+
+
+SLOW_QUERIES = SlowQueryLog()
+
+
+class TimedCursor:
+    """Cursor wrapper that keeps timing a statement until its rows are consumed.
+
+    SQLite steps a SELECT lazily, so most of its work happens in fetch*() and
+    iteration rather than in execute(). Time (and VM steps) spent in those
+    calls is added to the statement, which is recorded once the rows run out,
+    the cursor is closed or it is garbage collected.
+    """
+
+    __slots__ = ("_conn", "_cursor", "_sql", "_parameters", "_many", "_seconds", "_ticks", "_runs", "_done")
+
+    def __init__(self, conn, run, sql, parameters, many):
+        self._conn = conn
+        self._cursor = None
+        self._sql = sql
+        self._parameters = parameters
+        self._many = many
+        self._seconds = 0.0
+        self._ticks = 0
+        self._runs = 0
+        self._done = False
+        try:
+            self._cursor = self._step(run, conn, sql, parameters)
+        except BaseException:
+            self._finish()
+            raise
+        if self._cursor.description is None:
+            self._finish()
+
+    def _step(self, call, *args):
+        conn = self._conn
+        ticks, runs = conn.vm_ticks, conn.traced_runs
+        start = time.perf_counter()
+        try:
+            return call(*args)
+        finally:
+            self._seconds += time.perf_counter() - start
+            self._ticks += conn.vm_ticks - ticks
+            self._runs += conn.traced_runs - runs
+
+    def _finish(self):
+        if self._done:
+            return
+        self._done = True
+        self._conn.record_statement(self._sql, self._parameters, self._many, self._seconds, self._ticks, self._runs)
+
+    def fetchone(self):
+        row = self._step(self._cursor.fetchone)
+        if row is None:
+            self._finish()
+        return row
+
+    def fetchmany(self, size=None):
+        size = self._cursor.arraysize if size is None else size
+        rows = self._step(self._cursor.fetchmany, size)
+        if len(rows) < size:
+            self._finish()
+        return rows
+
+    def fetchall(self):
+        rows = self._step(self._cursor.fetchall)
+        self._finish()
+        return rows
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        try:
+            return self._step(next, self._cursor)
+        except StopIteration:
+            self._finish()
+            raise
+
+    def close(self):
+        self._finish()
+        self._cursor.close()
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __del__(self):
+        self._finish()
+
+
+class PooledConnection(sqlite3.Connection):
+    """sqlite3 connection whose close() hands it back to its pool."""
+
+    pool = None
+    dedicated = False
+    archive_attached = False
+    slow_query_hooks = False
+    vm_ticks = 0
+    traced_runs = 0
+
+    def attach_archive(self):
+        """ATTACH the archive database as ``archive`` once it exists; returns whether it is attached.
+
+        Must be called outside a transaction. The writer runs on a dedicated
+        connection that never calls this, so live writes never take locks on
+        the archive file.
+        """
+        if not self.archive_attached and os.path.exists(ARCHIVE_DB_PATH):
+            self.execute("ATTACH DATABASE ? AS archive", (ARCHIVE_DB_PATH,))
+            self.archive_attached = True
+        return self.archive_attached
+
+    def enable_slow_query_hooks(self):
+        # The trace callback sees every statement run (with bound values, which
+        # are deliberately not logged); the progress handler samples VM steps.
+        self.slow_query_hooks = True
+        self.set_trace_callback(self._trace)
+        self.set_progress_handler(self._progress, SLOW_QUERY_PROGRESS_STEPS)
+
+    def _trace(self, statement):
+        # Both counters only ever grow; TimedCursor takes per-statement deltas.
+        self.traced_runs += 1
+
+    def _progress(self):
+        self.vm_ticks += 1
+        return 0
+
+    def _timed(self, run, sql, parameters, many=False):
+        if many and self.slow_query_hooks:
+            parameters = list(parameters)
+        return TimedCursor(self, run, sql, parameters, many)
+
+    def record_statement(self, sql, parameters, many, seconds, vm_ticks, runs):
+        METRICS.observe_query(current_handler(), seconds)
+        if self.slow_query_hooks and seconds * 1000 >= SLOW_QUERY_MS:
+            SLOW_QUERIES.report(self, sql, parameters, seconds, many, vm_ticks, runs)
+
+    def execute(self, sql, parameters=()):
+        return self._timed(sqlite3.Connection.execute, sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self._timed(sqlite3.Connection.executemany, sql, seq_of_parameters, many=True)
+
+    def close(self):
+        if self.pool is None:
+            super().close()
+            return
+        self.pool.release(self)
+
+    def discard(self):
+        super().close()
+
+
+class ConnectionPool:
+    """Bounded LIFO pool of WAL-mode connections to a single database file.
+
+    Connections are created on demand; at most ``size`` idle connections are
+    kept around, anything returned beyond that is really closed.
+    """
+
+    def __init__(self, path, size=DB_POOL_SIZE):
+        if DB_SYNCHRONOUS not in {"OFF", "NORMAL", "FULL", "EXTRA"}:
+            raise ValueError(f"POS_DB_SYNCHRONOUS geçersiz: {DB_SYNCHRONOUS}")
+        self.path = path
+        self.size = size
+        self._idle = queue.LifoQueue(maxsize=size)
+        self._lock = threading.Lock()
+        self._wal_ready = False
+        self.open_count = 0
+
+    def _connect(self):
+        conn = sqlite3.connect(
+            self.path,
+            timeout=DB_BUSY_TIMEOUT_MS / 1000,
+            check_same_thread=False,
+            factory=PooledConnection,
+        )
+        conn.row_factory = sqlite3.Row
+        conn.execute(f"PRAGMA busy_timeout = {DB_BUSY_TIMEOUT_MS}")
+        with self._lock:
+            if not self._wal_ready:
+                conn.execute("PRAGMA journal_mode = WAL")
+                self._wal_ready = True
+        conn.execute(f"PRAGMA synchronous = {DB_SYNCHRONOUS}")
+        conn.execute(f"PRAGMA cache_size = {DB_CACHE_SIZE}")
+        conn.execute(f"PRAGMA mmap_size = {DB_MMAP_SIZE}")
+        conn.pool = self
+        if SLOW_QUERY_MS is not None:
+            conn.enable_slow_query_hooks()
+        with self._lock:
+            self.open_count += 1
+        return conn
+
+    def _discard(self, conn):
+        conn.discard()
+        with self._lock:
+            self.open_count -= 1
+
+    def idle_count(self):
+        return self._idle.qsize()
+
+    def acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            return self._connect()
+
+    def acquire_dedicated(self):
+        """A connection that is closed instead of pooled on release.
+
+        It never picks up per-connection state left by other users of the
+        pool (such as the archive ATTACH).
+        """
+        conn = self._connect()
+        conn.dedicated = True
+        return conn
+
+    def release(self, conn):
+        if conn.dedicated:
+            self._discard(conn)
+            return
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            self._discard(conn)
+            return
+        try:
+            self._idle.put_nowait(conn)
+        except queue.Full:
+            self._discard(conn)
+
+    def close_all(self):
+        while True:
+            try:
+                self._discard(self._idle.get_nowait())
+            except queue.Empty:
+                return
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None or _pool.path != DB_PATH:
+            if _pool is not None:
+                _pool.close_all()
+            _pool = ConnectionPool(DB_PATH)
+        return _pool
+
+
 def get_conn():
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
+    return get_pool().acquire()
 
 
-def init_db():
-    conn = get_conn()
-    cur = conn.cursor()
+@METRICS.gauge("pos_db_connections_open", "SQLite connections currently open (in use + idle).")
+def _sample_open_connections():
+    return get_pool().open_count
+
+
+@METRICS.gauge("pos_db_connections_idle", "SQLite connections idle in the pool.")
+def _sample_idle_connections():
+    return get_pool().idle_count()
+
 
+def _migration_001_base_schema(cur):
     cur.execute(
         """
         CREATE TABLE IF NOT EXISTS tables (
@@ -105,75 +649,1157 @@ def init_db():
             [(name, category, price, now_iso()) for name, category, price in seeded_menu],
         )
 
-    conn.commit()
-    conn.close()
+
+def _migration_002_order_indexes(cur):
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_orders_status_table ON orders(status, table_id)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_order_items_order_status ON order_items(order_id, status)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_orders_closed_at ON orders(closed_at)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_order_items_menu_item ON order_items(menu_item_id)")
+    cur.execute("ANALYZE")
+
+
+def _migration_003_daily_rollups(cur):
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS daily_sales (
+            day TEXT PRIMARY KEY,
+            closed_orders INTEGER NOT NULL DEFAULT 0,
+            revenue REAL NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+        """
+    )
+
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS daily_payment_sales (
+            day TEXT NOT NULL,
+            payment_method TEXT NOT NULL,
+            order_count INTEGER NOT NULL DEFAULT 0,
+            amount REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY(day, payment_method)
+        ) WITHOUT ROWID
+        """
+    )
+
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS daily_item_sales (
+            day TEXT NOT NULL,
+            menu_item_id INTEGER NOT NULL,
+            qty INTEGER NOT NULL DEFAULT 0,
+            amount REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY(day, menu_item_id)
+        ) WITHOUT ROWID
+        """
+    )
+
+    rebuild_rollups(cur)
+
+
+def _migration_004_order_total_triggers(cur):
+    # orders.total_amount is kept current by applying each line's delta;
+    # find_order_total_mismatches() is the full-recompute cross-check.
+    cur.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_order_items_total_insert
+        AFTER INSERT ON order_items
+        WHEN NEW.status != 'cancelled'
+        BEGIN
+            UPDATE orders
+            SET total_amount = ROUND(total_amount + NEW.quantity * NEW.unit_price, 2)
+            WHERE id = NEW.order_id;
+        END
+        """
+    )
+
+    cur.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_order_items_total_update
+        AFTER UPDATE OF order_id, quantity, unit_price, status ON order_items
+        WHEN (OLD.status = 'cancelled') != (NEW.status = 'cancelled')
+          OR OLD.quantity != NEW.quantity
+          OR OLD.unit_price != NEW.unit_price
+          OR OLD.order_id != NEW.order_id
+        BEGIN
+            UPDATE orders
+            SET total_amount = ROUND(total_amount - OLD.quantity * OLD.unit_price, 2)
+            WHERE id = OLD.order_id AND OLD.status != 'cancelled';
+            UPDATE orders
+            SET total_amount = ROUND(total_amount + NEW.quantity * NEW.unit_price, 2)
+            WHERE id = NEW.order_id AND NEW.status != 'cancelled';
+        END
+        """
+    )
+
+    cur.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_order_items_total_delete
+        AFTER DELETE ON order_items
+        WHEN OLD.status != 'cancelled'
+        BEGIN
+            UPDATE orders
+            SET total_amount = ROUND(total_amount - OLD.quantity * OLD.unit_price, 2)
+            WHERE id = OLD.order_id;
+        END
+        """
+    )
+
+    cur.execute(
+        """
+        UPDATE orders
+        SET total_amount = (
+            SELECT ROUND(COALESCE(SUM(quantity * unit_price), 0), 2)
+            FROM order_items
+            WHERE order_id = orders.id AND status != 'cancelled'
+        )
+        """
+    )
+
+
+def _migration_005_closed_orders_index(cur):
+    # Index order is (status, closed_at, rowid), which is exactly the order
+    # the export walks closed orders in, so it needs no sort over the range.
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_orders_status_closed_at ON orders(status, closed_at)")
+    cur.execute("ANALYZE")
+
+
+# Ordered schema migrations; the index + 1 is the resulting PRAGMA user_version.
+# Only ever append to this list.
+MIGRATIONS = [
+    _migration_001_base_schema,
+    _migration_002_order_indexes,
+    _migration_003_daily_rollups,
+    _migration_004_order_total_triggers,
+    _migration_005_closed_orders_index,
+]
+
+
+def schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def init_db():
+    conn = get_conn()
+    try:
+        if schema_version(conn) >= len(MIGRATIONS):
+            return
+
+        conn.execute("BEGIN IMMEDIATE")
+        cur = conn.cursor()
+        # Re-read under the write lock: another process may have migrated meanwhile.
+        version = schema_version(conn)
+        for number, migration in enumerate(MIGRATIONS[version:], start=version + 1):
+            migration(cur)
+            cur.execute(f"PRAGMA user_version = {number}")
+        conn.commit()
+    finally:
+        conn.close()
 
 
 def row_to_dict(row):
     return dict(row) if row is not None else None
 
 
-def fetch_order_with_items(conn, order_id):
-    order = conn.execute(
-        """
-        SELECT o.id, o.table_id, t.name AS table_name, o.status, o.created_at, o.closed_at,
-               o.payment_method, o.total_amount
-        FROM orders o
+ORDER_LINE_JSON = """
+    json_object(
+        'id', oi.id, 'order_id', oi.order_id, 'menu_item_id', oi.menu_item_id,
+        'menu_item_name', mi.name, 'quantity', oi.quantity, 'unit_price', oi.unit_price,
+        'status', oi.status, 'notes', oi.notes,
+        'line_total', ROUND(oi.quantity * oi.unit_price, 2)
+    )
+"""
+
+
+def fetch_order_json(conn, order_id, schema="main"):
+    """Return the order with its lines as a JSON document built by SQLite, or None."""
+    row = conn.execute(
+        f"""
+        SELECT json_object(
+            'id', o.id, 'table_id', o.table_id, 'table_name', t.name, 'status', o.status,
+            'created_at', o.created_at, 'closed_at', o.closed_at,
+            'payment_method', o.payment_method, 'total_amount', o.total_amount,
+            'items', json((
+                SELECT json_group_array(json(line))
+                FROM (
+                    SELECT {ORDER_LINE_JSON} AS line
+                    FROM {schema}.order_items oi
+                    JOIN menu_items mi ON mi.id = oi.menu_item_id
+                    WHERE oi.order_id = o.id
+                    ORDER BY oi.id DESC
+                )
+            )),
+            'computed_total', (
+                SELECT ROUND(COALESCE(SUM(quantity * unit_price), 0), 2)
+                FROM {schema}.order_items
+                WHERE order_id = o.id AND status != 'cancelled'
+            )
+        )
+        FROM {schema}.orders o
         JOIN tables t ON t.id = o.table_id
         WHERE o.id = ?
         """,
         (order_id,),
     ).fetchone()
+    return row[0] if row is not None else None
 
-    if order is None:
-        return None
 
-    items = conn.execute(
-        """
-        SELECT oi.id, oi.order_id, oi.menu_item_id, mi.name AS menu_item_name,
-               oi.quantity, oi.unit_price, oi.status, oi.notes,
-               ROUND(oi.quantity * oi.unit_price, 2) AS line_total
-        FROM order_items oi
-        JOIN menu_items mi ON mi.id = oi.menu_item_id
-        WHERE oi.order_id = ?
-        ORDER BY oi.id DESC
+def fetch_order_delta_json(conn, order_id, item_ids):
+    """Return only the given lines of an order plus its current total, as JSON."""
+    placeholders = ", ".join("?" for _ in item_ids)
+    row = conn.execute(
+        f"""
+        SELECT json_object(
+            'order_id', o.id, 'status', o.status, 'total_amount', o.total_amount,
+            'items', json((
+                SELECT json_group_array(json(line))
+                FROM (
+                    SELECT {ORDER_LINE_JSON} AS line
+                    FROM order_items oi
+                    JOIN menu_items mi ON mi.id = oi.menu_item_id
+                    WHERE oi.order_id = o.id AND oi.id IN ({placeholders})
+                    ORDER BY oi.id DESC
+                )
+            ))
+        )
+        FROM orders o
+        WHERE o.id = ?
         """,
-        (order_id,),
+        [*item_ids, order_id],
+    ).fetchone()
+    return row[0] if row is not None else None
+
+
+def find_order_total_mismatches(conn):
+    return conn.execute(
+        """
+        SELECT o.id, o.status, o.total_amount,
+               ROUND(COALESCE(SUM(CASE WHEN oi.status != 'cancelled'
+                                       THEN oi.quantity * oi.unit_price END), 0), 2) AS computed_total
+        FROM orders o
+        LEFT JOIN order_items oi ON oi.order_id = o.id
+        GROUP BY o.id
+        HAVING ABS(o.total_amount - computed_total) > 0.005
+        ORDER BY o.id
+        """
     ).fetchall()
 
-    payload = row_to_dict(order)
-    payload["items"] = [row_to_dict(i) for i in items]
-    payload["computed_total"] = round(
-        sum(i["line_total"] for i in items if i["status"] != "cancelled"),
-        2,
-    )
-    return payload
 
+def apply_order_to_rollup(conn, order_id, sign=1):
+    """Add (sign=1) or remove (sign=-1) a closed order's contribution to the daily rollups."""
+    order = conn.execute(
+        """
+        SELECT date(closed_at) AS day, payment_method, total_amount
+        FROM orders
+        WHERE id = ? AND status = 'closed'
+        """,
+        (order_id,),
+    ).fetchone()
+    if order is None:
+        return
 
-def compute_order_total(conn, order_id):
-    row = conn.execute(
+    conn.execute(
         """
-        SELECT ROUND(COALESCE(SUM(quantity * unit_price), 0), 2) AS total
+        INSERT INTO daily_sales(day, closed_orders, revenue) VALUES (?, ?, ?)
+        ON CONFLICT(day) DO UPDATE SET
+            closed_orders = closed_orders + excluded.closed_orders,
+            revenue = revenue + excluded.revenue
+        """,
+        (order["day"], sign, sign * order["total_amount"]),
+    )
+    conn.execute(
+        """
+        INSERT INTO daily_payment_sales(day, payment_method, order_count, amount) VALUES (?, ?, ?, ?)
+        ON CONFLICT(day, payment_method) DO UPDATE SET
+            order_count = order_count + excluded.order_count,
+            amount = amount + excluded.amount
+        """,
+        (order["day"], order["payment_method"], sign, sign * order["total_amount"]),
+    )
+    conn.execute(
+        """
+        INSERT INTO daily_item_sales(day, menu_item_id, qty, amount)
+        SELECT ?, menu_item_id, ? * SUM(quantity), ? * SUM(quantity * unit_price)
         FROM order_items
         WHERE order_id = ? AND status != 'cancelled'
+        GROUP BY menu_item_id
+        ON CONFLICT(day, menu_item_id) DO UPDATE SET
+            qty = qty + excluded.qty,
+            amount = amount + excluded.amount
         """,
-        (order_id,),
-    ).fetchone()
-    return float(row["total"])
+        (order["day"], sign, sign, order_id),
+    )
+
+
+def rebuild_rollups(conn):
+    conn.execute("DELETE FROM daily_sales")
+    conn.execute("DELETE FROM daily_payment_sales")
+    conn.execute("DELETE FROM daily_item_sales")
+
+    # Archived orders still count; the two files are summed with upserts
+    # rather than a UNION so each side keeps using its own indexes.
+    schemas = ["main", "archive"] if is_archive_attached(conn) else ["main"]
+    for schema in schemas:
+        conn.execute(
+            f"""
+            INSERT INTO daily_sales(day, closed_orders, revenue)
+            SELECT date(closed_at), COUNT(*), COALESCE(SUM(total_amount), 0)
+            FROM {schema}.orders
+            WHERE status = 'closed'
+            GROUP BY date(closed_at)
+            ON CONFLICT(day) DO UPDATE SET
+                closed_orders = closed_orders + excluded.closed_orders,
+                revenue = revenue + excluded.revenue
+            """
+        )
+        conn.execute(
+            f"""
+            INSERT INTO daily_payment_sales(day, payment_method, order_count, amount)
+            SELECT date(closed_at), payment_method, COUNT(*), COALESCE(SUM(total_amount), 0)
+            FROM {schema}.orders
+            WHERE status = 'closed'
+            GROUP BY date(closed_at), payment_method
+            ON CONFLICT(day, payment_method) DO UPDATE SET
+                order_count = order_count + excluded.order_count,
+                amount = amount + excluded.amount
+            """
+        )
+        conn.execute(
+            f"""
+            INSERT INTO daily_item_sales(day, menu_item_id, qty, amount)
+            SELECT date(o.closed_at), oi.menu_item_id, SUM(oi.quantity), SUM(oi.quantity * oi.unit_price)
+            FROM {schema}.order_items oi
+            JOIN {schema}.orders o ON o.id = oi.order_id
+            WHERE o.status = 'closed' AND oi.status != 'cancelled'
+            GROUP BY date(o.closed_at), oi.menu_item_id
+            ON CONFLICT(day, menu_item_id) DO UPDATE SET
+                qty = qty + excluded.qty,
+                amount = amount + excluded.amount
+            """
+        )
+
+
+ARCHIVE_ORDER_COLUMNS = "id, table_id, status, created_at, closed_at, payment_method, total_amount"
+ARCHIVE_ITEM_COLUMNS = "id, order_id, menu_item_id, quantity, unit_price, status, notes"
+
+
+def is_archive_attached(conn):
+    return any(row[1] == "archive" for row in conn.execute("PRAGMA database_list"))
+
+
+def ensure_archive(conn):
+    """Create (if needed) and attach the archive database with its schema."""
+    if not conn.archive_attached:
+        conn.execute("ATTACH DATABASE ? AS archive", (ARCHIVE_DB_PATH,))
+        conn.archive_attached = True
+    conn.execute("PRAGMA archive.journal_mode = WAL")
+    # Archived rows keep their live ids; AUTOINCREMENT on the live tables
+    # guarantees those ids are never handed out again.
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS archive.orders (
+            id INTEGER PRIMARY KEY,
+            table_id INTEGER NOT NULL,
+            status TEXT NOT NULL,
+            created_at TEXT NOT NULL,
+            closed_at TEXT,
+            payment_method TEXT,
+            total_amount REAL NOT NULL DEFAULT 0
+        )
+        """
+    )
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS archive.order_items (
+            id INTEGER PRIMARY KEY,
+            order_id INTEGER NOT NULL,
+            menu_item_id INTEGER NOT NULL,
+            quantity INTEGER NOT NULL,
+            unit_price REAL NOT NULL,
+            status TEXT NOT NULL,
+            notes TEXT
+        )
+        """
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS archive.idx_orders_status_closed_at ON orders(status, closed_at)")
+    conn.execute("CREATE INDEX IF NOT EXISTS archive.idx_order_items_order_status ON order_items(order_id, status)")
+
+
+def archive_closed_orders(conn, cutoff, batch_size=ARCHIVE_BATCH_ORDERS):
+    """Move orders closed before ``cutoff`` and their lines to the archive, one batch per transaction.
+
+    Rows are copied with INSERT OR IGNORE before they are deleted, so a batch
+    interrupted between the two files is completed by the next run.
+    Returns (orders moved, lines moved).
+    """
+    moved_orders = moved_items = 0
+    while True:
+        conn.execute("BEGIN IMMEDIATE")
+        ids = [
+            row[0]
+            for row in conn.execute(
+                """
+                SELECT id FROM main.orders
+                WHERE status = 'closed' AND closed_at < ?
+                ORDER BY closed_at, id
+                LIMIT ?
+                """,
+                (cutoff, batch_size),
+            )
+        ]
+        if not ids:
+            conn.rollback()
+            return moved_orders, moved_items
+
+        placeholders = ", ".join("?" for _ in ids)
+        conn.execute(
+            f"""
+            INSERT OR IGNORE INTO archive.orders({ARCHIVE_ORDER_COLUMNS})
+            SELECT {ARCHIVE_ORDER_COLUMNS} FROM main.orders WHERE id IN ({placeholders})
+            """,
+            ids,
+        )
+        conn.execute(
+            f"""
+            INSERT OR IGNORE INTO archive.order_items({ARCHIVE_ITEM_COLUMNS})
+            SELECT {ARCHIVE_ITEM_COLUMNS} FROM main.order_items WHERE order_id IN ({placeholders})
+            """,
+            ids,
+        )
+        # Orders go first so the line-delete trigger finds no order total to adjust.
+        conn.execute(f"DELETE FROM main.orders WHERE id IN ({placeholders})", ids)
+        moved_items += conn.execute(
+            f"DELETE FROM main.order_items WHERE order_id IN ({placeholders})", ids
+        ).rowcount
+        conn.commit()
+        moved_orders += len(ids)
+
+
+PAYMENT_METHODS = ("nakit", "kart", "qr", "yemek-karti")
+
+EXPORT_COLUMNS = (
+    "order_id", "closed_at", "table_id", "table_name", "payment_method", "order_total",
+    "item_id", "menu_item_id", "menu_item_name", "category", "quantity", "unit_price",
+    "line_total", "status", "notes",
+)
+
+
+def iter_order_export_batches(conn, start, end, payment_method=None, table_id=None, category=None):
+    """Yield lines of orders closed in [start, end) in EXPORT_BATCH_ROWS batches.
+
+    Rows come straight off one cursor ordered by close time, order and line,
+    so memory use does not depend on the size of the range.
+    """
+    filters = ["o.status = 'closed'", "o.closed_at >= ?", "o.closed_at < ?"]
+    params = [start, end]
+    if payment_method is not None:
+        filters.append("o.payment_method = ?")
+        params.append(payment_method)
+    if table_id is not None:
+        filters.append("o.table_id = ?")
+        params.append(table_id)
+    if category is not None:
+        filters.append("mi.category = ?")
+        params.append(category)
+
+    schemas = ["main"]
+    if conn.attach_archive():
+        archived_until = conn.execute(
+            "SELECT MAX(closed_at) FROM archive.orders WHERE status = 'closed'"
+        ).fetchone()[0]
+        # Everything archived was closed before what is still live, so reading
+        # the archive first keeps the output in close-time order.
+        if archived_until is not None and archived_until >= start:
+            schemas.insert(0, "archive")
+
+    for schema in schemas:
+        cursor = conn.execute(
+            f"""
+            SELECT o.id AS order_id, o.closed_at, o.table_id, t.name AS table_name,
+                   o.payment_method, o.total_amount AS order_total,
+                   oi.id AS item_id, oi.menu_item_id, mi.name AS menu_item_name, mi.category,
+                   oi.quantity, oi.unit_price, ROUND(oi.quantity * oi.unit_price, 2) AS line_total,
+                   oi.status, oi.notes
+            FROM {schema}.orders o
+            JOIN tables t ON t.id = o.table_id
+            JOIN {schema}.order_items oi ON oi.order_id = o.id
+            JOIN menu_items mi ON mi.id = oi.menu_item_id
+            WHERE {" AND ".join(filters)}
+            ORDER BY o.closed_at, o.id, oi.id
+            """,
+            params,
+        )
+        while True:
+            rows = cursor.fetchmany(EXPORT_BATCH_ROWS)
+            if not rows:
+                break
+            yield rows
+
+
+KITCHEN_TICKETS_SQL = """
+    SELECT oi.id, oi.order_id, t.name AS table_name, mi.name AS menu_item_name,
+           oi.quantity, oi.status, oi.notes, o.created_at
+    FROM order_items oi
+    JOIN orders o ON o.id = oi.order_id
+    JOIN tables t ON t.id = o.table_id
+    JOIN menu_items mi ON mi.id = oi.menu_item_id
+"""
+
+
+def fetch_kitchen_tickets(conn):
+    rows = conn.execute(
+        KITCHEN_TICKETS_SQL
+        + """
+        WHERE o.status = 'open' AND oi.status = 'pending'
+        ORDER BY oi.id ASC
+        """
+    ).fetchall()
+    return [row_to_dict(r) for r in rows]
+
+
+def fetch_kitchen_tickets_by_ids(conn, item_ids):
+    placeholders = ", ".join("?" for _ in item_ids)
+    rows = conn.execute(
+        KITCHEN_TICKETS_SQL + f" WHERE oi.id IN ({placeholders}) ORDER BY oi.id ASC",
+        list(item_ids),
+    ).fetchall()
+    return [row_to_dict(r) for r in rows]
+
+
+def _shared_counters(count):
+    """Zeroed 64-bit counters in anonymous shared memory, inherited by forked workers."""
+    return memoryview(mmap.mmap(-1, 8 * count)).cast("Q")
+
+
+class KitchenEventBus:
+    """Fan-out of kitchen ticket changes to connected Server-Sent Events clients.
+
+    Every subscriber gets its own bounded queue. A subscriber that falls
+    behind is not allowed to block publishers: its queue is flushed and it
+    receives ``None``, which tells the stream to resend a full snapshot.
+
+    With pre-fork workers, events published by another worker are not
+    relayed. Every worker counts its publishes in shared memory, and a watcher
+    thread resyncs the local streams whenever another worker's count moves.
+    """
+
+    SHUTDOWN = object()
+
+    def __init__(self, queue_size=KITCHEN_STREAM_QUEUE_SIZE):
+        self._lock = threading.Lock()
+        self._subscribers = set()
+        self._queue_size = queue_size
+        self._closed = False
+        self._published = None
+        self._slot = 0
+        self.last_event_id = 0
+
+    def share(self, slots):
+        self._published = _shared_counters(slots)
+
+    def bind(self, slot):
+        self._slot = slot
+        threading.Thread(target=self._watch_remote, name="pos-kitchen-remote", daemon=True).start()
+
+    def subscribe(self):
+        events = queue.Queue(maxsize=self._queue_size)
+        with self._lock:
+            if self._closed:
+                events.put_nowait(self.SHUTDOWN)
+            self._subscribers.add(events)
+        return events
+
+    def unsubscribe(self, events):
+        with self._lock:
+            self._subscribers.discard(events)
+
+    def subscriber_count(self):
+        return len(self._subscribers)
+
+    def publish(self, event, data):
+        with self._lock:
+            self.last_event_id += 1
+            if self._published is not None:
+                self._published[self._slot] += 1
+            message = (self.last_event_id, event, data)
+            for events in self._subscribers:
+                try:
+                    events.put_nowait(message)
+                except queue.Full:
+                    self._replace_queued(events, None)
+
+    def shutdown(self):
+        """End every open stream; used by a worker that is draining before exit."""
+        with self._lock:
+            self._closed = True
+            for events in self._subscribers:
+                self._replace_queued(events, self.SHUTDOWN)
+
+    def _remote_publishes(self):
+        counts = self._published.tolist()
+        return sum(counts) - counts[self._slot]
+
+    def _watch_remote(self):
+        seen = self._remote_publishes()
+        while True:
+            time.sleep(KITCHEN_STREAM_REMOTE_POLL_SECONDS)
+            current = self._remote_publishes()
+            if current == seen:
+                continue
+            seen = current
+            with self._lock:
+                for events in self._subscribers:
+                    self._replace_queued(events, None)
+
+    @staticmethod
+    def _replace_queued(events, message):
+        while True:
+            try:
+                events.get_nowait()
+            except queue.Empty:
+                break
+        events.put_nowait(message)
+
+
+KITCHEN_EVENTS = KitchenEventBus()
+
+
+@METRICS.gauge("pos_kitchen_stream_clients", "Connected kitchen Server-Sent Events clients.")
+def _sample_kitchen_stream_clients():
+    return KITCHEN_EVENTS.subscriber_count()
+
+
+class ApiError(Exception):
+    """Request-level failure raised from inside a write operation."""
+
+    def __init__(self, status, message, **extra):
+        super().__init__(message)
+        self.status = status
+        self.payload = {"error": message, **extra}
+
+
+def ensure_order_open(conn, order_id, closed_message):
+    order = conn.execute("SELECT id, status FROM orders WHERE id = ?", (order_id,)).fetchone()
+    if order is None:
+        raise ApiError(HTTPStatus.NOT_FOUND, "Sipariş bulunamadı")
+    if order["status"] != "open":
+        raise ApiError(HTTPStatus.CONFLICT, closed_message)
+
+
+class _WriteJob:
+    __slots__ = ("operation", "handler", "done", "result", "error")
+
+    def __init__(self, operation):
+        self.operation = operation
+        self.handler = current_handler()
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class WriteQueue:
+    """Single writer thread that group-commits queued mutations.
+
+    Request threads submit ``operation(conn)`` callables and block until the
+    transaction containing their operation has committed. The writer takes
+    everything queued (up to WRITE_BATCH_MAX, optionally waiting
+    WRITE_BATCH_WINDOW_MS for more) and runs it in one BEGIN IMMEDIATE ...
+    COMMIT, so a burst of requests costs one fsync instead of one each.
+    Every operation runs inside its own SAVEPOINT: one that raises is rolled
+    back on its own and its exception is re-raised in the submitting thread.
+    """
+
+    def __init__(self, max_batch=WRITE_BATCH_MAX, window_ms=WRITE_BATCH_WINDOW_MS):
+        self.max_batch = max_batch
+        self.window = window_ms / 1000
+        self._jobs = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="pos-writer", daemon=True)
+                self._thread.start()
+
+    def submit(self, operation):
+        self._ensure_started()
+        job = _WriteJob(operation)
+        self._jobs.put(job)
+        job.done.wait()
+        if job.error is not None:
+            raise job.error
+        return job.result
+
+    def stop(self):
+        with self._lock:
+            thread = self._thread
+            self._thread = None
+        if thread is not None and thread.is_alive():
+            self._jobs.put(None)
+            thread.join()
+
+    def _collect(self, first):
+        batch = [first]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch:
+            timeout = deadline - time.monotonic()
+            try:
+                job = self._jobs.get(timeout=timeout) if timeout > 0 else self._jobs.get_nowait()
+            except queue.Empty:
+                break
+            if job is None:
+                self._jobs.put(None)
+                break
+            batch.append(job)
+        return batch
+
+    def _run(self):
+        conn = get_pool().acquire_dedicated()
+        try:
+            while True:
+                job = self._jobs.get()
+                if job is None:
+                    return
+                self._execute(conn, self._collect(job))
+        finally:
+            conn.close()
+
+    def _execute(self, conn, batch):
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for job in batch:
+                conn.execute("SAVEPOINT write_job")
+                _request_context.handler = job.handler
+                try:
+                    job.result = job.operation(conn)
+                except Exception as exc:
+                    conn.execute("ROLLBACK TO write_job")
+                    job.error = exc
+                finally:
+                    _request_context.handler = None
+                conn.execute("RELEASE write_job")
+            conn.commit()
+        except sqlite3.Error as exc:
+            if conn.in_transaction:
+                conn.rollback()
+            for job in batch:
+                if job.error is None:
+                    job.error = exc
+                    job.result = None
+        finally:
+            for job in batch:
+                job.done.set()
+
+
+WRITER = WriteQueue()
+
+
+@METRICS.gauge("pos_write_queue_depth", "Mutations waiting for the writer thread.")
+def _sample_write_queue_depth():
+    return WRITER._jobs.qsize()
+
+
+class WriteGenerations:
+    """Per-table write counters, bumped by mutation handlers after they commit.
+
+    Cached GET responses are keyed by the counters of the tables they read,
+    so any committed write to one of those tables invalidates them.
+
+    Pre-fork workers share the counters: ``share()`` moves them into shared
+    memory with one row per worker slot before forking. A worker only
+    increments its own row and readers sum all rows, so totals never go
+    backwards and no cross-process lock is needed.
+    """
+
+    TABLES = ("tables", "menu_items", "orders", "order_items")
+
+    def __init__(self):
+        self._index = {name: i for i, name in enumerate(self.TABLES)}
+        self._values = [0] * len(self.TABLES)
+        self._lock = threading.Lock()
+        self._shared = None
+        self._slot = 0
+
+    def share(self, slots):
+        self._shared = _shared_counters(slots * len(self.TABLES))
+
+    def bind(self, slot):
+        self._slot = slot
+
+    def bump(self, *tables):
+        with self._lock:
+            if self._shared is None:
+                for name in tables:
+                    self._values[self._index[name]] += 1
+                return
+            row = self._slot * len(self.TABLES)
+            for name in tables:
+                self._shared[row + self._index[name]] += 1
+
+    def snapshot(self, tables):
+        if self._shared is None:
+            values = self._values
+        else:
+            width = len(self.TABLES)
+            counters = self._shared.tolist()
+            values = [sum(counters[i::width]) for i in range(width)]
+        return tuple(values[self._index[name]] for name in tables)
+
+
+class ResponseCache:
+    """Encoded JSON bodies of cacheable GET routes, one entry per route template.
+
+    Cached routes ignore their query string, so keying on the template keeps
+    cache-busting parameters from adding entries.
+    """
+
+    def __init__(self):
+        self._entries = {}
+
+    def get(self, key, generations):
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == generations:
+            return entry[1], entry[2]
+        return None
+
+    def put(self, key, generations, body):
+        etag = f'"{hashlib.sha1(body).hexdigest()[:20]}"'
+        self._entries[key] = (generations, etag, body)
+        return etag, body
+
+
+WRITE_GENERATIONS = WriteGenerations()
+RESPONSE_CACHE = ResponseCache()
+
+
+class Route:
+    __slots__ = ("method", "template", "handler", "body", "query", "streaming", "cache")
+
+    def __init__(
+        self, method, template, handler, body=False, query=False, streaming=False, cache=None
+    ):
+        self.method = method
+        self.template = template
+        self.handler = handler
+        self.body = body
+        self.query = query
+        self.streaming = streaming
+        # Tables whose WRITE_GENERATIONS key the cached response; None disables caching.
+        self.cache = cache
+
+
+class Router:
+    """Method + path dispatch table.
+
+    Literal paths resolve with one dict lookup; templates with ``{name:int}``
+    or ``{name}`` segments resolve by walking a segment trie, so lookup cost
+    depends on the number of path segments, not on the number of routes.
+    """
+
+    _CONVERTERS = {
+        "int": lambda value: int(value) if value.isascii() and value.isdigit() else None,
+        "str": lambda value: value or None,
+    }
+
+    def __init__(self):
+        self._literal = {}
+        self._trie = self._node()
+
+    @staticmethod
+    def _node():
+        return {"literal": {}, "param": None, "routes": {}}
+
+    def add(self, method, template, handler, **options):
+        route = Route(method, template, handler, **options)
+        segments = template.strip("/").split("/")
+        if not any(segment.startswith("{") for segment in segments):
+            methods = self._literal.setdefault(template, {})
+        else:
+            node = self._trie
+            for segment in segments:
+                if segment.startswith("{") and segment.endswith("}"):
+                    name, _, kind = segment[1:-1].partition(":")
+                    converter = self._CONVERTERS[kind or "str"]
+                    if node["param"] is None:
+                        node["param"] = (converter, self._node())
+                    elif node["param"][0] is not converter:
+                        raise ValueError(f"Çakışan route parametresi: {template}")
+                    node = node["param"][1]
+                else:
+                    node = node["literal"].setdefault(segment, self._node())
+            methods = node["routes"]
+
+        if method in methods:
+            raise ValueError(f"Route zaten tanımlı: {method} {template}")
+        methods[method] = route
+        return route
+
+    def route(self, method, template, **options):
+        def decorator(handler):
+            self.add(method, template, handler, **options)
+            return handler
+
+        return decorator
+
+    def _lookup(self, path):
+        methods = self._literal.get(path)
+        if methods is not None:
+            return methods, []
+
+        node = self._trie
+        params = []
+        for segment in path[1:].split("/"):
+            child = node["literal"].get(segment)
+            if child is not None:
+                node = child
+                continue
+            if node["param"] is None:
+                return None, None
+            converter, child = node["param"]
+            value = converter(segment)
+            if value is None:
+                return None, None
+            params.append(value)
+            node = child
+        return (node["routes"] or None), params
+
+    def resolve(self, method, path):
+        """Return ``(route, params, allowed_methods)``; route is None on 404/405.
+
+        Trailing slashes are ignored, for literal and templated routes alike.
+        """
+        methods, params = self._lookup("/" + path.strip("/"))
+        if methods is None:
+            return None, None, ()
+        route = methods.get(method)
+        if route is None:
+            return None, None, tuple(sorted(methods))
+        return route, params, ()
+
+
+ROUTES = Router()
+
+
+class StaticAsset:
+    __slots__ = ("body", "gzip_body", "etag", "gzip_etag", "content_type")
+
+    def __init__(self, body, content_type):
+        self.body = body
+        self.content_type = content_type
+        digest = hashlib.sha256(body).hexdigest()[:20]
+        self.etag = f'"{digest}"'
+        self.gzip_body = None
+        self.gzip_etag = None
+        if len(body) >= STATIC_GZIP_MIN_BYTES and _is_compressible(content_type):
+            compressed = gzip.compress(body, compresslevel=9, mtime=0)
+            if len(compressed) < len(body):
+                self.gzip_body = compressed
+                self.gzip_etag = f'"{digest}-gz"'
+
+
+def _is_compressible(content_type):
+    return content_type.startswith("text/") or any(
+        kind in content_type for kind in ("javascript", "json", "xml", "svg")
+    )
+
+
+class StaticAssetCache:
+    """In-memory copy of STATIC_DIR with gzip variants and strong ETags.
+
+    Files are (re)loaded when their size or mtime changes; the directory is
+    re-stat'ed at most every STATIC_RESCAN_SECONDS. Only paths present in the
+    cache are ever served, so request paths never reach the filesystem.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self._assets = {}
+        self._signature = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def _scan(self):
+        signature = {}
+        for directory, _, files in os.walk(self.root):
+            for name in files:
+                full_path = os.path.join(directory, name)
+                stat = os.stat(full_path)
+                url_path = "/" + os.path.relpath(full_path, self.root).replace(os.sep, "/")
+                signature[url_path] = (full_path, stat.st_size, stat.st_mtime_ns)
+        return signature
+
+    def load(self):
+        with self._lock:
+            self._refresh(force=True)
+
+    def _refresh(self, force=False):
+        now = time.monotonic()
+        if not force and now - self._checked_at < STATIC_RESCAN_SECONDS:
+            return
+        self._checked_at = now
+        signature = self._scan()
+        if signature == self._signature:
+            return
 
+        previous = self._signature or {}
+        assets = {}
+        for url_path, entry in signature.items():
+            if previous.get(url_path) == entry and url_path in self._assets:
+                assets[url_path] = self._assets[url_path]
+                continue
+            with open(entry[0], "rb") as fh:
+                body = fh.read()
+            content_type = mimetypes.guess_type(url_path)[0] or "application/octet-stream"
+            if _is_compressible(content_type):
+                content_type += "; charset=utf-8"
+            assets[url_path] = StaticAsset(body, content_type)
+        self._assets = assets
+        self._signature = signature
+
+    def get(self, path):
+        # Decode before the traversal check so %2e%2e cannot sneak past it.
+        path = unquote(path)
+        if "\\" in path or "\0" in path or any(part in (".", "..") for part in path.split("/")):
+            return None
+        with self._lock:
+            self._refresh()
+            assets = self._assets
+        if path.endswith("/"):
+            path += "index.html"
+        return assets.get(path)
+
+
+STATIC_ASSETS = StaticAssetCache(STATIC_DIR)
+
+
+def _accepts_gzip(accept_encoding):
+    for part in (accept_encoding or "").split(","):
+        coding, _, params = part.strip().partition(";")
+        if coding.strip().lower() not in ("gzip", "*"):
+            continue
+        quality = params.strip()
+        if quality.startswith("q="):
+            try:
+                return float(quality[2:]) > 0
+            except ValueError:
+                return False
+        return True
+    return False
+
+
+class RestaurantHandler(BaseHTTPRequestHandler):
+
+    def _send_json(self, payload, status=HTTPStatus.OK, headers=None):
+        self._send_raw_json(json.dumps(payload, ensure_ascii=False), status, headers)
 
-class RestaurantHandler(SimpleHTTPRequestHandler):
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, directory=STATIC_DIR, **kwargs)
+    _cache_fill = None
 
-    def _send_json(self, payload, status=HTTPStatus.OK):
-        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    def _send_raw_json(self, document, status=HTTPStatus.OK, headers=None):
+        body = document.encode("utf-8")
+        if self._cache_fill is not None and status == HTTPStatus.OK:
+            key, generations = self._cache_fill
+            self._send_cached(*RESPONSE_CACHE.put(key, generations, body))
+            return
         self.send_response(status)
         self.send_header("Content-Type", "application/json; charset=utf-8")
         self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
         self.end_headers()
         self.wfile.write(body)
 
+    def _write_sse(self, event, data, event_id=None):
+        lines = []
+        if event_id is not None:
+            lines.append(f"id: {event_id}")
+        lines.append(f"event: {event}")
+        lines.append(f"data: {json.dumps(data, ensure_ascii=False)}")
+        self.wfile.write(("\n".join(lines) + "\n\n").encode("utf-8"))
+        self.wfile.flush()
+
+    def _stream_export(self, batches, export_format, start_day, end_day):
+        # Chunked transfer encoding needs HTTP/1.1 on both ends (the asyncio
+        # server); HTTP/1.0 responses are delimited by closing the connection.
+        chunked = self.protocol_version == "HTTP/1.1" and self.request_version == "HTTP/1.1"
+        content_type = "text/csv" if export_format == "csv" else "application/x-ndjson"
+        filename = f"siparisler_{start_day.isoformat()}_{end_day.isoformat()}.{export_format}"
+
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", f"{content_type}; charset=utf-8")
+        self.send_header("Content-Disposition", f'attachment; filename="{filename}"')
+        self.send_header("Cache-Control", "no-store")
+        if chunked:
+            self.send_header("Transfer-Encoding", "chunked")
+        else:
+            self.send_header("Connection", "close")
+            self.close_connection = True
+        self.end_headers()
+
+        def write(text):
+            data = text.encode("utf-8")
+            if not data:
+                return
+            if chunked:
+                data = f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n"
+            self.wfile.write(data)
+
+        if export_format == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer, lineterminator="\n")
+            writer.writerow(EXPORT_COLUMNS)
+            for rows in batches:
+                writer.writerows(rows)
+                write(buffer.getvalue())
+                buffer.seek(0)
+                buffer.truncate()
+            write(buffer.getvalue())
+        else:
+            # Lines of one order are adjacent in the cursor, so orders can be
+            # emitted as soon as the next one starts, even across batches.
+            order = None
+            for rows in batches:
+                out = []
+                for row in rows:
+                    if order is None or order["id"] != row["order_id"]:
+                        if order is not None:
+                            out.append(json.dumps(order, ensure_ascii=False))
+                        order = {
+                            "id": row["order_id"],
+                            "closed_at": row["closed_at"],
+                            "table_id": row["table_id"],
+                            "table_name": row["table_name"],
+                            "payment_method": row["payment_method"],
+                            "total_amount": row["order_total"],
+                            "items": [],
+                        }
+                    order["items"].append(
+                        {
+                            "id": row["item_id"],
+                            "menu_item_id": row["menu_item_id"],
+                            "menu_item_name": row["menu_item_name"],
+                            "category": row["category"],
+                            "quantity": row["quantity"],
+                            "unit_price": row["unit_price"],
+                            "line_total": row["line_total"],
+                            "status": row["status"],
+                            "notes": row["notes"],
+                        }
+                    )
+                if out:
+                    write("\n".join(out) + "\n")
+            if order is not None:
+                write(json.dumps(order, ensure_ascii=False) + "\n")
+
+        if chunked:
+            self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+    def _order_response(self, conn, order_id, item_ids=None):
+        # ?view=delta on a line mutation returns just the touched lines and the new total.
+        if item_ids is not None and parse_qs(urlparse(self.path).query).get("view") == ["delta"]:
+            return fetch_order_delta_json(conn, order_id, item_ids)
+        return fetch_order_json(conn, order_id)
+
     def _read_json(self):
         length = int(self.headers.get("Content-Length", "0"))
         raw = self.rfile.read(length) if length > 0 else b"{}"
@@ -182,87 +1808,160 @@ class RestaurantHandler(SimpleHTTPRequestHandler):
         except json.JSONDecodeError:
             return None
 
-    def do_GET(self):
-        parsed = urlparse(self.path)
-        path = parsed.path
-
-        if path == "/api/health":
-            self._send_json({"ok": True, "time": now_iso()})
+    def _send_cached(self, etag, body):
+        if_none_match = self.headers.get("If-None-Match")
+        if if_none_match and etag in (tag.strip() for tag in if_none_match.split(",")):
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", "no-cache")
+            self.end_headers()
             return
 
-        if path == "/api/tables":
-            self._handle_get_tables()
-            return
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        self.wfile.write(body)
 
-        if path == "/api/menu-items":
-            self._handle_get_menu_items()
+    def _serve_static(self, path, head_only=False):
+        asset = STATIC_ASSETS.get(path)
+        if asset is None:
+            self.send_error(HTTPStatus.NOT_FOUND, "File not found")
             return
 
-        if path == "/api/orders/open":
-            self._handle_get_open_orders()
-            return
+        if asset.gzip_body is not None and _accepts_gzip(self.headers.get("Accept-Encoding")):
+            body, etag, encoding = asset.gzip_body, asset.gzip_etag, "gzip"
+        else:
+            body, etag, encoding = asset.body, asset.etag, None
 
-        if path == "/api/kitchen/tickets":
-            self._handle_get_kitchen_tickets()
-            return
+        if_none_match = self.headers.get("If-None-Match")
+        not_modified = if_none_match is not None and (
+            if_none_match.strip() == "*"
+            or any(tag.strip().removeprefix("W/") in (asset.etag, asset.gzip_etag)
+                   for tag in if_none_match.split(","))
+        )
 
-        if path == "/api/reports/daily":
-            self._handle_get_daily_report(parsed.query)
+        self.send_response(HTTPStatus.NOT_MODIFIED if not_modified else HTTPStatus.OK)
+        self.send_header("ETag", etag)
+        self.send_header("Cache-Control", f"public, max-age={STATIC_MAX_AGE}" if STATIC_MAX_AGE else "no-cache")
+        self.send_header("Vary", "Accept-Encoding")
+        if not_modified:
+            self.end_headers()
             return
 
-        m = re.fullmatch(r"/api/orders/(\d+)", path)
-        if m:
-            self._handle_get_order(int(m.group(1)))
-            return
+        self.send_header("Content-Type", asset.content_type)
+        self.send_header("Content-Length", str(len(body)))
+        if encoding:
+            self.send_header("Content-Encoding", encoding)
+        self.end_headers()
+        if not head_only:
+            self.wfile.write(body)
 
-        if path == "/":
-            self.path = "/index.html"
-        return super().do_GET()
+    _response_status = None
+    _response_bytes = None
 
-    def do_POST(self):
-        parsed = urlparse(self.path)
-        path = parsed.path
-        body = self._read_json()
+    def send_response(self, code, message=None):
+        self._response_status = int(code)
+        super().send_response(code, message)
 
-        if body is None:
-            self._send_json({"error": "Geçersiz JSON body"}, status=HTTPStatus.BAD_REQUEST)
-            return
+    def send_header(self, keyword, value):
+        if keyword.lower() == "content-length":
+            self._response_bytes = int(value)
+        super().send_header(keyword, value)
 
-        if path == "/api/menu-items":
-            self._handle_post_menu_item(body)
-            return
+    def _dispatch(self, method):
+        start = time.perf_counter()
+        self._route_label = "unmatched"
+        try:
+            self._dispatch_route(method)
+        finally:
+            _request_context.handler = None
+            METRICS.observe_request(
+                self._route_label,
+                method,
+                self._response_status or 0,
+                time.perf_counter() - start,
+                self._response_bytes,
+            )
 
-        if path == "/api/orders":
-            self._handle_post_order(body)
+    def _dispatch_route(self, method):
+        parsed = urlparse(self.path)
+        path = parsed.path
+        route, params, allowed = ROUTES.resolve(method, path)
+
+        if route is None:
+            if allowed:
+                self._send_json(
+                    {"error": "Bu endpoint için yöntem desteklenmiyor"},
+                    status=HTTPStatus.METHOD_NOT_ALLOWED,
+                    headers={"Allow": ", ".join(allowed)},
+                )
+            elif method in ("GET", "HEAD") and not path.startswith("/api/"):
+                self._route_label = "static"
+                self._serve_static(path, head_only=method == "HEAD")
+            else:
+                self._send_json({"error": "Endpoint bulunamadı"}, status=HTTPStatus.NOT_FOUND)
             return
 
-        m = re.fullmatch(r"/api/orders/(\d+)/items", path)
-        if m:
-            self._handle_post_order_item(int(m.group(1)), body)
-            return
+        self._route_label = route.template
+        _request_context.handler = route.handler.__name__
+
+        if route.cache is not None and method == "GET" and RESPONSE_CACHE_ENABLED:
+            # Read the generations before the handler touches SQLite: a write that
+            # commits in between can then only make the stored entry stale, never
+            # pair old data with new generations.
+            generations = WRITE_GENERATIONS.snapshot(route.cache)
+            cached = RESPONSE_CACHE.get(route.template, generations)
+            if cached is not None:
+                self._send_cached(*cached)
+                return
+            self._cache_fill = (route.template, generations)
+
+        args = list(params)
+        if route.body:
+            body = self._read_json()
+            if body is None:
+                self._send_json({"error": "Geçersiz JSON body"}, status=HTTPStatus.BAD_REQUEST)
+                return
+            args.append(body)
+        if route.query:
+            args.append(parsed.query)
+        route.handler(self, *args)
 
-        m = re.fullmatch(r"/api/orders/(\d+)/close", path)
-        if m:
-            self._handle_close_order(int(m.group(1)), body)
-            return
+    def do_GET(self):
+        self._dispatch("GET")
 
-        self._send_json({"error": "Endpoint bulunamadı"}, status=HTTPStatus.NOT_FOUND)
+    def do_HEAD(self):
+        self._dispatch("HEAD")
+
+    def do_POST(self):
+        self._dispatch("POST")
 
     def do_PATCH(self):
-        path = urlparse(self.path).path
-        body = self._read_json()
+        self._dispatch("PATCH")
 
-        if body is None:
-            self._send_json({"error": "Geçersiz JSON body"}, status=HTTPStatus.BAD_REQUEST)
-            return
+    def do_PUT(self):
+        self._dispatch("PUT")
 
-        m = re.fullmatch(r"/api/order-items/(\d+)", path)
-        if m:
-            self._handle_patch_order_item(int(m.group(1)), body)
-            return
+    def do_DELETE(self):
+        self._dispatch("DELETE")
 
-        self._send_json({"error": "Endpoint bulunamadı"}, status=HTTPStatus.NOT_FOUND)
+    @ROUTES.route("GET", "/metrics")
+    def _handle_get_metrics(self):
+        body = METRICS.render().encode("utf-8")
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
 
+    @ROUTES.route("GET", "/api/health")
+    def _handle_get_health(self):
+        self._send_json({"ok": True, "time": now_iso()})
+
+    @ROUTES.route("GET", "/api/tables", cache=("tables", "orders"))
     def _handle_get_tables(self):
         conn = get_conn()
         rows = conn.execute(
@@ -289,6 +1988,7 @@ class RestaurantHandler(SimpleHTTPRequestHandler):
 
         self._send_json(payload)
 
+    @ROUTES.route("GET", "/api/menu-items", cache=("menu_items",))
     def _handle_get_menu_items(self):
         conn = get_conn()
         rows = conn.execute(
@@ -302,6 +2002,7 @@ class RestaurantHandler(SimpleHTTPRequestHandler):
         conn.close()
         self._send_json([row_to_dict(r) for r in rows])
 
+    @ROUTES.route("POST", "/api/menu-items", body=True)
     def _handle_post_menu_item(self, body):
         name = str(body.get("name", "")).strip()
         category = str(body.get("category", "")).strip() or "Diğer"
@@ -321,20 +2022,25 @@ class RestaurantHandler(SimpleHTTPRequestHandler):
             self._send_json({"error": "Fiyat negatif olamaz"}, status=HTTPStatus.BAD_REQUEST)
             return
 
+        def insert_menu_item(conn):
+            return conn.execute(
+                "INSERT INTO menu_items(name, category, price, created_at) VALUES (?, ?, ?, ?)",
+                (name, category, price, now_iso()),
+            ).lastrowid
+
+        menu_item_id = WRITER.submit(insert_menu_item)
+        WRITE_GENERATIONS.bump("menu_items")
+
         conn = get_conn()
-        cur = conn.execute(
-            "INSERT INTO menu_items(name, category, price, created_at) VALUES (?, ?, ?, ?)",
-            (name, category, price, now_iso()),
-        )
-        conn.commit()
         created = conn.execute(
             "SELECT id, name, category, price, is_active, created_at FROM menu_items WHERE id = ?",
-            (cur.lastrowid,),
+            (menu_item_id,),
         ).fetchone()
         conn.close()
 
         self._send_json(row_to_dict(created), status=HTTPStatus.CREATED)
 
+    @ROUTES.route("POST", "/api/orders", body=True)
     def _handle_post_order(self, body):
         table_id = body.get("table_id")
         try:
@@ -343,45 +2049,54 @@ class RestaurantHandler(SimpleHTTPRequestHandler):
             self._send_json({"error": "Geçerli bir masa seçiniz"}, status=HTTPStatus.BAD_REQUEST)
             return
 
-        conn = get_conn()
-        table = conn.execute("SELECT id, name FROM tables WHERE id = ?", (table_id,)).fetchone()
-        if table is None:
-            conn.close()
-            self._send_json({"error": "Masa bulunamadı"}, status=HTTPStatus.NOT_FOUND)
-            return
-
-        existing = conn.execute(
-            "SELECT id FROM orders WHERE table_id = ? AND status = 'open' ORDER BY id DESC LIMIT 1",
-            (table_id,),
-        ).fetchone()
+        def open_order(conn):
+            table = conn.execute("SELECT id, name FROM tables WHERE id = ?", (table_id,)).fetchone()
+            if table is None:
+                raise ApiError(HTTPStatus.NOT_FOUND, "Masa bulunamadı")
+
+            existing = conn.execute(
+                "SELECT id FROM orders WHERE table_id = ? AND status = 'open' ORDER BY id DESC LIMIT 1",
+                (table_id,),
+            ).fetchone()
+            if existing:
+                return existing["id"], False
+
+            cur = conn.execute(
+                "INSERT INTO orders(table_id, status, created_at) VALUES (?, 'open', ?)",
+                (table_id, now_iso()),
+            )
+            return cur.lastrowid, True
 
-        if existing:
-            payload = fetch_order_with_items(conn, existing["id"])
-            conn.close()
-            self._send_json(payload, status=HTTPStatus.OK)
+        try:
+            order_id, created = WRITER.submit(open_order)
+        except ApiError as exc:
+            self._send_json(exc.payload, status=exc.status)
             return
 
-        cur = conn.execute(
-            "INSERT INTO orders(table_id, status, created_at) VALUES (?, 'open', ?)",
-            (table_id, now_iso()),
-        )
-        conn.commit()
-        payload = fetch_order_with_items(conn, cur.lastrowid)
+        if created:
+            WRITE_GENERATIONS.bump("orders")
+
+        conn = get_conn()
+        payload = fetch_order_json(conn, order_id)
         conn.close()
 
-        self._send_json(payload, status=HTTPStatus.CREATED)
+        self._send_raw_json(payload, status=HTTPStatus.CREATED if created else HTTPStatus.OK)
 
+    @ROUTES.route("GET", "/api/orders/{order_id:int}")
     def _handle_get_order(self, order_id):
         conn = get_conn()
-        payload = fetch_order_with_items(conn, order_id)
+        payload = fetch_order_json(conn, order_id)
+        if payload is None and conn.attach_archive():
+            payload = fetch_order_json(conn, order_id, schema="archive")
         conn.close()
 
         if payload is None:
             self._send_json({"error": "Sipariş bulunamadı"}, status=HTTPStatus.NOT_FOUND)
             return
 
-        self._send_json(payload)
+        self._send_raw_json(payload)
 
+    @ROUTES.route("POST", "/api/orders/{order_id:int}/items", body=True)
     def _handle_post_order_item(self, order_id, body):
         menu_item_id = body.get("menu_item_id")
         quantity = body.get("quantity", 1)
@@ -398,47 +2113,121 @@ class RestaurantHandler(SimpleHTTPRequestHandler):
             self._send_json({"error": "Adet en az 1 olmalıdır"}, status=HTTPStatus.BAD_REQUEST)
             return
 
-        conn = get_conn()
+        def add_item(conn):
+            ensure_order_open(conn, order_id, "Kapalı siparişe ürün eklenemez")
 
-        order = conn.execute(
-            "SELECT id, status FROM orders WHERE id = ?",
-            (order_id,),
-        ).fetchone()
-        if order is None:
-            conn.close()
-            self._send_json({"error": "Sipariş bulunamadı"}, status=HTTPStatus.NOT_FOUND)
-            return
+            menu_item = conn.execute(
+                "SELECT id, price FROM menu_items WHERE id = ? AND is_active = 1",
+                (menu_item_id,),
+            ).fetchone()
+            if menu_item is None:
+                raise ApiError(HTTPStatus.NOT_FOUND, "Ürün bulunamadı")
 
-        if order["status"] != "open":
-            conn.close()
-            self._send_json({"error": "Kapalı siparişe ürün eklenemez"}, status=HTTPStatus.CONFLICT)
+            return conn.execute(
+                """
+                INSERT INTO order_items(order_id, menu_item_id, quantity, unit_price, status, notes)
+                VALUES (?, ?, ?, ?, 'pending', ?)
+                """,
+                (order_id, menu_item_id, quantity, menu_item["price"], notes),
+            ).lastrowid
+
+        try:
+            item_id = WRITER.submit(add_item)
+        except ApiError as exc:
+            self._send_json(exc.payload, status=exc.status)
             return
 
-        menu_item = conn.execute(
-            "SELECT id, price FROM menu_items WHERE id = ? AND is_active = 1",
-            (menu_item_id,),
-        ).fetchone()
-        if menu_item is None:
-            conn.close()
-            self._send_json({"error": "Ürün bulunamadı"}, status=HTTPStatus.NOT_FOUND)
+        WRITE_GENERATIONS.bump("order_items", "orders")
+
+        conn = get_conn()
+        for ticket in fetch_kitchen_tickets_by_ids(conn, [item_id]):
+            KITCHEN_EVENTS.publish("ticket-added", ticket)
+        payload = self._order_response(conn, order_id, [item_id])
+        conn.close()
+        self._send_raw_json(payload, status=HTTPStatus.CREATED)
+
+    @ROUTES.route("POST", "/api/orders/{order_id:int}/items/batch", body=True)
+    def _handle_post_order_items_batch(self, order_id, body):
+        lines = body.get("items") if isinstance(body, dict) else body
+        if not isinstance(lines, list) or not lines:
+            self._send_json({"error": "En az bir ürün satırı gönderiniz"}, status=HTTPStatus.BAD_REQUEST)
             return
 
-        conn.execute(
-            """
-            INSERT INTO order_items(order_id, menu_item_id, quantity, unit_price, status, notes)
-            VALUES (?, ?, ?, ?, 'pending', ?)
-            """,
-            (order_id, menu_item_id, quantity, menu_item["price"], notes),
-        )
+        parsed = []
+        for index, line in enumerate(lines, start=1):
+            if not isinstance(line, dict):
+                self._send_json({"error": f"{index}. satır geçersiz"}, status=HTTPStatus.BAD_REQUEST)
+                return
+            try:
+                menu_item_id = int(line.get("menu_item_id"))
+                quantity = int(line.get("quantity", 1))
+            except (TypeError, ValueError):
+                self._send_json(
+                    {"error": f"{index}. satır: Ürün ve adet bilgisi geçersiz"},
+                    status=HTTPStatus.BAD_REQUEST,
+                )
+                return
+            if quantity < 1:
+                self._send_json(
+                    {"error": f"{index}. satır: Adet en az 1 olmalıdır"},
+                    status=HTTPStatus.BAD_REQUEST,
+                )
+                return
+            parsed.append((menu_item_id, quantity, str(line.get("notes", "")).strip()))
+
+        def add_items(conn):
+            ensure_order_open(conn, order_id, "Kapalı siparişe ürün eklenemez")
+
+            menu_item_ids = sorted({menu_item_id for menu_item_id, _, _ in parsed})
+            placeholders = ", ".join("?" for _ in menu_item_ids)
+            prices = {
+                r["id"]: r["price"]
+                for r in conn.execute(
+                    f"SELECT id, price FROM menu_items WHERE is_active = 1 AND id IN ({placeholders})",
+                    menu_item_ids,
+                )
+            }
+            missing = [menu_item_id for menu_item_id in menu_item_ids if menu_item_id not in prices]
+            if missing:
+                raise ApiError(HTTPStatus.NOT_FOUND, "Ürün bulunamadı", menu_item_ids=missing)
+
+            conn.executemany(
+                """
+                INSERT INTO order_items(order_id, menu_item_id, quantity, unit_price, status, notes)
+                VALUES (?, ?, ?, ?, 'pending', ?)
+                """,
+                [
+                    (order_id, menu_item_id, quantity, prices[menu_item_id], notes)
+                    for menu_item_id, quantity, notes in parsed
+                ],
+            )
 
-        total = compute_order_total(conn, order_id)
-        conn.execute("UPDATE orders SET total_amount = ? WHERE id = ?", (total, order_id))
-        conn.commit()
+            # Only the writer thread writes, so this order's newest len(parsed)
+            # lines are exactly the ones added above.
+            return [
+                r["id"]
+                for r in conn.execute(
+                    "SELECT id FROM order_items WHERE order_id = ? ORDER BY id DESC LIMIT ?",
+                    (order_id, len(parsed)),
+                )
+            ]
+
+        try:
+            added_ids = WRITER.submit(add_items)
+        except ApiError as exc:
+            self._send_json(exc.payload, status=exc.status)
+            return
 
-        payload = fetch_order_with_items(conn, order_id)
+        WRITE_GENERATIONS.bump("order_items", "orders")
+
+        conn = get_conn()
+        for ticket in fetch_kitchen_tickets_by_ids(conn, added_ids):
+            KITCHEN_EVENTS.publish("ticket-added", ticket)
+        payload = self._order_response(conn, order_id, added_ids)
         conn.close()
-        self._send_json(payload, status=HTTPStatus.CREATED)
+        self._send_raw_json(payload, status=HTTPStatus.CREATED)
 
+    @ROUTES.route("PATCH", "/api/order-items/{item_id:int}", body=True)
     def _handle_patch_order_item(self, item_id, body):
         new_status = str(body.get("status", "")).strip()
         allowed = {"pending", "prepared", "served", "cancelled"}
@@ -450,63 +2239,84 @@ class RestaurantHandler(SimpleHTTPRequestHandler):
             )
             return
 
-        conn = get_conn()
-        row = conn.execute(
-            "SELECT id, order_id FROM order_items WHERE id = ?",
-            (item_id,),
-        ).fetchone()
+        def update_status(conn):
+            row = conn.execute(
+                """
+                SELECT oi.id, oi.order_id, o.status AS order_status
+                FROM order_items oi
+                JOIN orders o ON o.id = oi.order_id
+                WHERE oi.id = ?
+                """,
+                (item_id,),
+            ).fetchone()
+            if row is None:
+                raise ApiError(HTTPStatus.NOT_FOUND, "Sipariş kalemi bulunamadı")
+
+            # Changing a line of an already closed order shifts that day's report figures.
+            order_closed = row["order_status"] == "closed"
+            if order_closed:
+                apply_order_to_rollup(conn, row["order_id"], -1)
+
+            conn.execute("UPDATE order_items SET status = ? WHERE id = ?", (new_status, item_id))
+            if order_closed:
+                apply_order_to_rollup(conn, row["order_id"], 1)
+            return row["order_id"]
 
-        if row is None:
-            conn.close()
-            self._send_json({"error": "Sipariş kalemi bulunamadı"}, status=HTTPStatus.NOT_FOUND)
+        try:
+            order_id = WRITER.submit(update_status)
+        except ApiError as exc:
+            self._send_json(exc.payload, status=exc.status)
             return
 
-        conn.execute("UPDATE order_items SET status = ? WHERE id = ?", (new_status, item_id))
-        total = compute_order_total(conn, row["order_id"])
-        conn.execute("UPDATE orders SET total_amount = ? WHERE id = ?", (total, row["order_id"]))
-        conn.commit()
-        order_payload = fetch_order_with_items(conn, row["order_id"])
+        WRITE_GENERATIONS.bump("order_items", "orders")
+
+        KITCHEN_EVENTS.publish(
+            "ticket-status-changed",
+            {"id": item_id, "order_id": order_id, "status": new_status},
+        )
+        conn = get_conn()
+        order_payload = self._order_response(conn, order_id, [item_id])
         conn.close()
-        self._send_json(order_payload)
+        self._send_raw_json(order_payload)
 
+    @ROUTES.route("POST", "/api/orders/{order_id:int}/close", body=True)
     def _handle_close_order(self, order_id, body):
         payment_method = str(body.get("payment_method", "")).strip().lower()
-        allowed = {"nakit", "kart", "qr", "yemek-karti"}
-        if payment_method not in allowed:
+        if payment_method not in PAYMENT_METHODS:
             self._send_json(
                 {"error": "Ödeme yöntemi geçersiz. (nakit, kart, qr, yemek-karti)"},
                 status=HTTPStatus.BAD_REQUEST,
             )
             return
 
-        conn = get_conn()
-        order = conn.execute("SELECT id, status FROM orders WHERE id = ?", (order_id,)).fetchone()
+        def close_order(conn):
+            ensure_order_open(conn, order_id, "Sipariş zaten kapalı")
+            conn.execute(
+                """
+                UPDATE orders
+                SET status = 'closed', closed_at = ?, payment_method = ?
+                WHERE id = ?
+                """,
+                (now_iso(), payment_method, order_id),
+            )
+            apply_order_to_rollup(conn, order_id, 1)
 
-        if order is None:
-            conn.close()
-            self._send_json({"error": "Sipariş bulunamadı"}, status=HTTPStatus.NOT_FOUND)
+        try:
+            WRITER.submit(close_order)
+        except ApiError as exc:
+            self._send_json(exc.payload, status=exc.status)
             return
 
-        if order["status"] != "open":
-            conn.close()
-            self._send_json({"error": "Sipariş zaten kapalı"}, status=HTTPStatus.CONFLICT)
-            return
+        WRITE_GENERATIONS.bump("orders")
 
-        total = compute_order_total(conn, order_id)
-        conn.execute(
-            """
-            UPDATE orders
-            SET status = 'closed', closed_at = ?, payment_method = ?, total_amount = ?
-            WHERE id = ?
-            """,
-            (now_iso(), payment_method, total, order_id),
-        )
-        conn.commit()
+        KITCHEN_EVENTS.publish("order-closed", {"order_id": order_id})
 
-        payload = fetch_order_with_items(conn, order_id)
+        conn = get_conn()
+        payload = fetch_order_json(conn, order_id)
         conn.close()
-        self._send_json(payload)
+        self._send_raw_json(payload)
 
+    @ROUTES.route("GET", "/api/orders/open", cache=("orders", "tables"))
     def _handle_get_open_orders(self):
         conn = get_conn()
         rows = conn.execute(
@@ -521,23 +2331,56 @@ class RestaurantHandler(SimpleHTTPRequestHandler):
         conn.close()
         self._send_json([row_to_dict(r) for r in rows])
 
+    @ROUTES.route(
+        "GET", "/api/kitchen/tickets", cache=("order_items", "orders", "tables", "menu_items")
+    )
     def _handle_get_kitchen_tickets(self):
+        self._send_json(self._kitchen_snapshot())
+
+    def _kitchen_snapshot(self):
         conn = get_conn()
-        rows = conn.execute(
-            """
-            SELECT oi.id, oi.order_id, t.name AS table_name, mi.name AS menu_item_name,
-                   oi.quantity, oi.status, oi.notes, o.created_at
-            FROM order_items oi
-            JOIN orders o ON o.id = oi.order_id
-            JOIN tables t ON t.id = o.table_id
-            JOIN menu_items mi ON mi.id = oi.menu_item_id
-            WHERE o.status = 'open' AND oi.status = 'pending'
-            ORDER BY oi.id ASC
-            """
-        ).fetchall()
+        tickets = fetch_kitchen_tickets(conn)
         conn.close()
-        self._send_json([row_to_dict(r) for r in rows])
+        return tickets
 
+    @ROUTES.route("GET", "/api/kitchen/stream", streaming=True)
+    def _handle_get_kitchen_stream(self):
+        # Subscribe before taking the snapshot so nothing committed in between is lost;
+        # clients key tickets by id, so a duplicate ticket-added is harmless.
+        events = KITCHEN_EVENTS.subscribe()
+        try:
+            self.send_response(HTTPStatus.OK)
+            self.send_header("Content-Type", "text/event-stream; charset=utf-8")
+            self.send_header("Cache-Control", "no-cache")
+            self.send_header("X-Accel-Buffering", "no")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            self.close_connection = True
+
+            self.wfile.write(b"retry: 2000\n\n")
+            self._write_sse("snapshot", self._kitchen_snapshot(), KITCHEN_EVENTS.last_event_id)
+            while True:
+                try:
+                    message = events.get(timeout=KITCHEN_STREAM_HEARTBEAT_SECONDS)
+                except queue.Empty:
+                    self.wfile.write(b": keep-alive\n\n")
+                    self.wfile.flush()
+                    continue
+
+                if message is KitchenEventBus.SHUTDOWN:
+                    return
+                if message is None:
+                    self._write_sse("snapshot", self._kitchen_snapshot(), KITCHEN_EVENTS.last_event_id)
+                    continue
+
+                event_id, event, data = message
+                self._write_sse(event, data, event_id)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            KITCHEN_EVENTS.unsubscribe(events)
+
+    @ROUTES.route("GET", "/api/reports/daily", query=True)
     def _handle_get_daily_report(self, query_string):
         query = parse_qs(query_string)
         day = query.get("date", [dt.date.today().isoformat()])[0]
@@ -553,21 +2396,19 @@ class RestaurantHandler(SimpleHTTPRequestHandler):
         totals = conn.execute(
             """
             SELECT
-              COUNT(*) AS closed_orders,
-              ROUND(COALESCE(SUM(total_amount), 0), 2) AS revenue
-            FROM orders
-            WHERE status = 'closed' AND date(closed_at) = date(?)
+              COALESCE(SUM(closed_orders), 0) AS closed_orders,
+              ROUND(COALESCE(SUM(revenue), 0), 2) AS revenue
+            FROM daily_sales
+            WHERE day = date(?)
             """,
             (day,),
         ).fetchone()
 
         payments = conn.execute(
             """
-            SELECT payment_method, COUNT(*) AS count,
-                   ROUND(COALESCE(SUM(total_amount), 0), 2) AS amount
-            FROM orders
-            WHERE status = 'closed' AND date(closed_at) = date(?)
-            GROUP BY payment_method
+            SELECT payment_method, order_count AS count, ROUND(amount, 2) AS amount
+            FROM daily_payment_sales
+            WHERE day = date(?) AND order_count > 0
             ORDER BY amount DESC
             """,
             (day,),
@@ -575,15 +2416,11 @@ class RestaurantHandler(SimpleHTTPRequestHandler):
 
         top_items = conn.execute(
             """
-            SELECT mi.name,
-                   SUM(oi.quantity) AS qty,
-                   ROUND(SUM(oi.quantity * oi.unit_price), 2) AS amount
-            FROM order_items oi
-            JOIN orders o ON o.id = oi.order_id
-            JOIN menu_items mi ON mi.id = oi.menu_item_id
-            WHERE o.status = 'closed' AND date(o.closed_at) = date(?) AND oi.status != 'cancelled'
-            GROUP BY mi.id, mi.name
-            ORDER BY qty DESC, amount DESC
+            SELECT mi.name, d.qty, ROUND(d.amount, 2) AS amount
+            FROM daily_item_sales d
+            JOIN menu_items mi ON mi.id = d.menu_item_id
+            WHERE d.day = date(?) AND d.qty > 0
+            ORDER BY d.qty DESC, amount DESC
             LIMIT 10
             """,
             (day,),
@@ -600,10 +2437,466 @@ class RestaurantHandler(SimpleHTTPRequestHandler):
             }
         )
 
+    @ROUTES.route("GET", "/api/exports/orders", query=True, streaming=True)
+    def _handle_get_orders_export(self, query_string):
+        query = {name: values[0].strip() for name, values in parse_qs(query_string).items()}
+        export_format = query.get("format", "csv")
+        if export_format not in ("csv", "ndjson"):
+            self._send_json({"error": "Format csv veya ndjson olmalı"}, status=HTTPStatus.BAD_REQUEST)
+            return
+
+        try:
+            end_day = dt.date.fromisoformat(query.get("to") or dt.date.today().isoformat())
+            start_day = dt.date.fromisoformat(query.get("from") or end_day.isoformat())
+        except ValueError:
+            self._send_json({"error": "Tarih formatı YYYY-MM-DD olmalı"}, status=HTTPStatus.BAD_REQUEST)
+            return
+        if start_day > end_day:
+            self._send_json(
+                {"error": "Başlangıç tarihi bitiş tarihinden sonra olamaz"}, status=HTTPStatus.BAD_REQUEST
+            )
+            return
+
+        payment_method = query.get("payment_method") or None
+        if payment_method is not None and payment_method not in PAYMENT_METHODS:
+            self._send_json(
+                {"error": "Ödeme yöntemi geçersiz. (nakit, kart, qr, yemek-karti)"},
+                status=HTTPStatus.BAD_REQUEST,
+            )
+            return
+
+        table_id = query.get("table_id") or None
+        if table_id is not None:
+            try:
+                table_id = int(table_id)
+            except ValueError:
+                self._send_json({"error": "Geçerli bir masa seçiniz"}, status=HTTPStatus.BAD_REQUEST)
+                return
+
+        # closed_at is stored as ISO text, so a string range keeps idx_orders_closed_at usable.
+        conn = get_conn()
+        batches = iter_order_export_batches(
+            conn,
+            start_day.isoformat(),
+            (end_day + dt.timedelta(days=1)).isoformat(),
+            payment_method,
+            table_id,
+            query.get("category") or None,
+        )
+        try:
+            self._stream_export(batches, export_format, start_day, end_day)
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True
+        finally:
+            batches.close()
+            conn.close()
+
+
+class _TransportWriter(io.RawIOBase):
+    """File-like wfile that forwards a worker thread's writes to an asyncio stream.
+
+    Writes are queued onto the event loop in order. Once enough bytes are in
+    flight (and on every flush) the worker thread waits for the transport to
+    drain, which keeps long streams from buffering unboundedly.
+    """
+
+    def __init__(self, loop, writer):
+        super().__init__()
+        self._loop = loop
+        self._writer = writer
+        self._pending = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        if self._writer.is_closing():
+            raise ConnectionResetError("İstemci bağlantısı kapandı")
+        chunk = bytes(data)
+        self._loop.call_soon_threadsafe(self._writer.write, chunk)
+        self._pending += len(chunk)
+        if self._pending >= ASYNC_DRAIN_THRESHOLD:
+            self.flush()
+        return len(chunk)
+
+    def flush(self):
+        if self._pending == 0:
+            return
+        self._pending = 0
+        asyncio.run_coroutine_threadsafe(self._writer.drain(), self._loop).result()
+
+
+class AsyncRestaurantHandler(RestaurantHandler):
+    """RestaurantHandler driven by the asyncio server for one already-read request."""
+
+    protocol_version = "HTTP/1.1"
+
+    def __init__(self, raw_request, client_address, wfile):
+        self.rfile = io.BytesIO(raw_request)
+        self.wfile = wfile
+        self.client_address = client_address
+        self.close_connection = True
+
+    def run(self):
+        try:
+            self.handle_one_request()
+            self.wfile.flush()
+        except ConnectionError:
+            return False
+        except Exception:
+            traceback.print_exc()
+            return False
+        return not self.close_connection
+
+
+def _parse_request_head(head):
+    request_line, _, header_block = head.partition(b"\r\n")
+    parts = request_line.split()
+    method = parts[0].decode("latin-1") if parts else ""
+    target = parts[1].decode("latin-1") if len(parts) > 1 else ""
+
+    content_length = 0
+    chunked = False
+    for line in header_block.split(b"\r\n"):
+        name, _, value = line.partition(b":")
+        name = name.strip().lower()
+        if name == b"content-length":
+            content_length = int(value.strip())
+            if content_length < 0:
+                raise ValueError("negative Content-Length")
+        elif name == b"transfer-encoding" and value.strip().lower() != b"identity":
+            chunked = True
+    return method, target, content_length, chunked
+
+
+async def _reply_and_close(writer, status):
+    body = f"{status.value} {status.phrase}".encode("latin-1")
+    writer.write(
+        f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+        f"Content-Type: text/plain\r\nContent-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode("latin-1")
+        + body
+    )
+    await writer.drain()
+
+
+async def _serve_async_connection(reader, writer, executors, stream_slots, connections):
+    loop = asyncio.get_running_loop()
+    peer = writer.get_extra_info("peername") or ("", 0)
+    executor, stream_executor = executors
+    # Maps each connection to whether it is in the middle of a request, so a
+    # draining worker only closes idle keep-alive connections.
+    connections[writer] = False
+    try:
+        while True:
+            try:
+                head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), ASYNC_KEEPALIVE_SECONDS)
+            except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+                return
+            except asyncio.LimitOverrunError:
+                await _reply_and_close(writer, HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE)
+                return
+            connections[writer] = True
+
+            try:
+                method, target, length, chunked = _parse_request_head(head)
+            except ValueError:
+                await _reply_and_close(writer, HTTPStatus.BAD_REQUEST)
+                return
+            if chunked:
+                await _reply_and_close(writer, HTTPStatus.LENGTH_REQUIRED)
+                return
+            if length > ASYNC_MAX_BODY_BYTES:
+                await _reply_and_close(writer, HTTPStatus.REQUEST_ENTITY_TOO_LARGE)
+                return
+
+            body = await reader.readexactly(length) if length else b""
+
+            route, _, _ = ROUTES.resolve(method, urlparse(target).path)
+            handler = AsyncRestaurantHandler(head + body, peer, _TransportWriter(loop, writer))
+            if route is not None and route.streaming:
+                # A stream would otherwise wait in the executor queue, never
+                # seeing a response, until another stream ends.
+                if stream_slots.locked():
+                    await _reply_and_close(writer, HTTPStatus.SERVICE_UNAVAILABLE)
+                    return
+                async with stream_slots:
+                    keep_alive = await loop.run_in_executor(stream_executor, handler.run)
+            else:
+                keep_alive = await loop.run_in_executor(executor, handler.run)
+            await writer.drain()
+            connections[writer] = False
+            if not keep_alive:
+                return
+    except (asyncio.IncompleteReadError, ConnectionError):
+        return
+    finally:
+        connections.pop(writer, None)
+        writer.close()
+
+
+async def _drain_async(server, connections):
+    server.close()
+    KITCHEN_EVENTS.shutdown()
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + WORKER_GRACEFUL_SECONDS
+    while connections and loop.time() < deadline:
+        for writer, busy in list(connections.items()):
+            if not busy:
+                writer.close()
+        await asyncio.sleep(0.05)
+    for writer in list(connections):
+        writer.close()
+
+
+async def serve_async(host, port, reuse_port=False, on_ready=None, stop_signal=None):
+    executors = (
+        ThreadPoolExecutor(max_workers=ASYNC_WORKERS, thread_name_prefix="pos-worker"),
+        ThreadPoolExecutor(max_workers=ASYNC_STREAM_WORKERS, thread_name_prefix="pos-stream"),
+    )
+    stream_slots = asyncio.Semaphore(ASYNC_STREAM_WORKERS)
+    connections = {}
+    server = await asyncio.start_server(
+        lambda reader, writer: _serve_async_connection(reader, writer, executors, stream_slots, connections),
+        host,
+        port,
+        reuse_port=reuse_port or None,
+    )
+    print(f"Restaurant POS server (asyncio) running at http://{host}:{port}")
+    if on_ready is not None:
+        on_ready()
+    try:
+        async with server:
+            if stop_signal is None:
+                await server.serve_forever()
+            else:
+                stopping = asyncio.Event()
+                asyncio.get_running_loop().add_signal_handler(stop_signal, stopping.set)
+                await stopping.wait()
+                await _drain_async(server, connections)
+    finally:
+        for executor in executors:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+class PosHTTPServer(ThreadingHTTPServer):
+    # Requests now queue on the writer; a deeper accept backlog keeps bursts
+    # from being reset by the kernel while they wait to be accepted.
+    request_queue_size = 128
 
-def run_server(host="127.0.0.1", port=8000):
+
+class PosWorkerHTTPServer(PosHTTPServer):
+    # Every worker binds its own socket and the kernel spreads connections
+    # across them. Request threads are joined on close so a draining worker
+    # lets in-flight requests finish.
+    allow_reuse_port = True
+    daemon_threads = False
+
+
+def _run_worker(slot, host, port, mode, ready_fd):
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGHUP, signal.SIG_IGN)
+    WRITE_GENERATIONS.bind(slot)
+    KITCHEN_EVENTS.bind(slot)
+    METRICS.const_labels = {"worker": slot}
+    STATIC_ASSETS.load()
+
+    def ready():
+        os.write(ready_fd, b"1")
+        os.close(ready_fd)
+
+    try:
+        if mode == "asyncio":
+            asyncio.run(
+                serve_async(host, port, reuse_port=True, on_ready=ready, stop_signal=signal.SIGTERM)
+            )
+            return
+
+        server = PosWorkerHTTPServer((host, port), RestaurantHandler)
+        # shutdown() waits for serve_forever to return, so it cannot run in the signal handler itself.
+        signal.signal(signal.SIGTERM, lambda signum, frame: threading.Thread(target=server.shutdown).start())
+        print(f"Restaurant POS worker {slot} (pid {os.getpid()}) running at http://{host}:{port}", flush=True)
+        ready()
+        server.serve_forever()
+        # Connections already queued on this socket would be reset when it closes.
+        server.socket.setblocking(False)
+        while True:
+            try:
+                request, client_address = server.get_request()
+            except BlockingIOError:
+                break
+            server.process_request(request, client_address)
+        KITCHEN_EVENTS.shutdown()
+        server.server_close()
+    finally:
+        WRITER.stop()
+        get_pool().close_all()
+
+
+class WorkerSupervisor:
+    """Pre-fork process manager behind ``serve --workers N``.
+
+    Workers are forked after migrations have run and each binds its own
+    SO_REUSEPORT socket on the same port. A worker that dies is replaced.
+    SIGHUP replaces the workers one at a time: the new worker must be
+    listening before the old one is told to drain (SIGTERM), so the port
+    never stops accepting. SIGTERM/SIGINT drain every worker and exit;
+    workers still busy after WORKER_GRACEFUL_SECONDS are killed.
+    """
+
+    def __init__(self, host, port, mode, count):
+        self.host = host
+        self.port = port
+        self.mode = mode
+        self.count = count
+        # Twice as many counter slots as workers, so a replacement never
+        # shares a slot with the worker it is replacing.
+        self.slot_count = 2 * count
+        self.slots = {}
+        self.started = {}
+        self._retiring = set()
+        self._crashed = []
+        self._signals = []
+
+    def _spawn(self):
+        slot = min(set(range(self.slot_count)) - set(self.slots))
+        ready_r, ready_w = os.pipe()
+        sys.stdout.flush()
+        sys.stderr.flush()
+        pid = os.fork()
+        if pid == 0:
+            os.close(ready_r)
+            code = 0
+            try:
+                _run_worker(slot, self.host, self.port, self.mode, ready_w)
+            except BaseException:
+                traceback.print_exc()
+                code = 1
+            finally:
+                sys.stdout.flush()
+                sys.stderr.flush()
+                os._exit(code)
+
+        os.close(ready_w)
+        self.slots[slot] = pid
+        self.started[pid] = time.monotonic()
+        return pid, ready_r
+
+    def _start_worker(self):
+        pid, ready_r = self._spawn()
+        try:
+            readable, _, _ = select.select([ready_r], [], [], WORKER_READY_TIMEOUT)
+            return pid, bool(readable) and os.read(ready_r, 1) == b"1"
+        finally:
+            os.close(ready_r)
+
+    def _reap(self):
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            for slot, owner in list(self.slots.items()):
+                if owner == pid:
+                    del self.slots[slot]
+            started = self.started.pop(pid, None)
+            if pid in self._retiring:
+                self._retiring.discard(pid)
+            elif started is not None:
+                code = os.waitstatus_to_exitcode(status)
+                print(f"Worker {pid} exited unexpectedly (code {code}), restarting", flush=True)
+                self._crashed.append(started)
+
+    def _terminate(self, pids):
+        self._retiring.update(pids)
+        for pid in pids:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+        deadline = time.monotonic() + WORKER_GRACEFUL_SECONDS
+        while True:
+            self._reap()
+            remaining = [pid for pid in pids if pid in self.started]
+            if not remaining:
+                return
+            if time.monotonic() >= deadline:
+                for pid in remaining:
+                    print(f"Worker {pid} did not drain in time, killing it", flush=True)
+                    try:
+                        os.kill(pid, signal.SIGKILL)
+                    except ProcessLookupError:
+                        pass
+                deadline = float("inf")
+            time.sleep(0.05)
+
+    def _rolling_restart(self):
+        print("Restarting workers one at a time", flush=True)
+        for old_pid in list(self.slots.values()):
+            new_pid, ready = self._start_worker()
+            if not ready:
+                print(f"Replacement worker {new_pid} did not start; restart aborted", flush=True)
+                self._terminate([new_pid])
+                return
+            self._terminate([old_pid])
+
+    def run(self):
+        WRITE_GENERATIONS.share(self.slot_count)
+        KITCHEN_EVENTS.share(self.slot_count)
+        for signum in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP):
+            signal.signal(signum, lambda signum, frame: self._signals.append(signum))
+
+        for _ in range(self.count):
+            pid, ready = self._start_worker()
+            if not ready:
+                print(f"Worker {pid} did not start", flush=True)
+                self._terminate(list(self.slots.values()))
+                raise SystemExit(1)
+        print(
+            f"Restaurant POS supervisor (pid {os.getpid()}) running {self.count} {self.mode} workers "
+            f"at http://{self.host}:{self.port}",
+            flush=True,
+        )
+
+        while True:
+            while self._signals:
+                if self._signals.pop(0) != signal.SIGHUP:
+                    self._terminate(list(self.slots.values()))
+                    return
+                self._rolling_restart()
+
+            self._reap()
+            while self._crashed:
+                started = self._crashed.pop(0)
+                if time.monotonic() - started < WORKER_RESPAWN_DELAY:
+                    time.sleep(WORKER_RESPAWN_DELAY)
+                self._start_worker()
+            time.sleep(0.2)
+
+
+def run_server(host="127.0.0.1", port=8000, mode=SERVER_MODE, workers=WORKERS):
     init_db()
-    server = ThreadingHTTPServer((host, port), RestaurantHandler)
+    if workers > 1:
+        # SQLite connections must not be carried across fork().
+        get_pool().close_all()
+        WorkerSupervisor(host, port, mode, workers).run()
+        return
+
+    STATIC_ASSETS.load()
+    if mode == "asyncio":
+        try:
+            asyncio.run(serve_async(host, port))
+        except KeyboardInterrupt:
+            pass
+        finally:
+            WRITER.stop()
+            get_pool().close_all()
+        return
+
+    server = PosHTTPServer((host, port), RestaurantHandler)
     print(f"Restaurant POS server running at http://{host}:{port}")
     try:
         server.serve_forever()
@@ -611,7 +2904,135 @@ def run_server(host="127.0.0.1", port=8000):
         pass
     finally:
         server.server_close()
+        WRITER.stop()
+        get_pool().close_all()
+
+
+def rebuild_rollups_command():
+    init_db()
+    conn = get_conn()
+    try:
+        conn.attach_archive()
+        conn.execute("BEGIN IMMEDIATE")
+        rebuild_rollups(conn)
+        conn.commit()
+        days = conn.execute("SELECT COUNT(*) FROM daily_sales").fetchone()[0]
+    finally:
+        conn.close()
+    print(f"Günlük rapor özetleri yeniden oluşturuldu ({days} gün)")
+
+
+def check_totals_command(fix=False):
+    init_db()
+    conn = get_conn()
+    try:
+        conn.attach_archive()
+        conn.execute("BEGIN IMMEDIATE")
+        mismatches = find_order_total_mismatches(conn)
+        for row in mismatches:
+            print(
+                f"Sipariş #{row['id']} ({row['status']}): "
+                f"kayıtlı {row['total_amount']:.2f}, hesaplanan {row['computed_total']:.2f}"
+            )
+            if fix:
+                conn.execute(
+                    "UPDATE orders SET total_amount = ? WHERE id = ?",
+                    (row["computed_total"], row["id"]),
+                )
+        # Closed-order totals feed the daily rollups, so those are rebuilt too.
+        if fix and any(row["status"] == "closed" for row in mismatches):
+            rebuild_rollups(conn)
+        conn.commit()
+    finally:
+        conn.close()
+
+    if not mismatches:
+        print("Tüm sipariş toplamları tutarlı")
+        return 0
+    if fix:
+        print(f"{len(mismatches)} sipariş toplamı düzeltildi")
+        return 0
+    print(f"{len(mismatches)} sipariş toplamı tutarsız (düzeltmek için --fix)")
+    return 1
+
+
+def archive_command(days, batch_size=ARCHIVE_BATCH_ORDERS, vacuum=False):
+    init_db()
+    cutoff = (dt.datetime.now() - dt.timedelta(days=days)).replace(microsecond=0).isoformat()
+    conn = get_conn()
+    try:
+        ensure_archive(conn)
+        moved_orders, moved_items = archive_closed_orders(conn, cutoff, batch_size)
+        if vacuum and moved_orders:
+            # Deleted pages are otherwise only reused, never returned to the OS.
+            conn.execute("VACUUM main")
+    finally:
+        conn.close()
+    print(
+        f"{cutoff} öncesi kapanan {moved_orders} sipariş ve {moved_items} kalem "
+        f"arşive taşındı ({ARCHIVE_DB_PATH})"
+    )
+
+
+def main(argv=None):
+    global SLOW_QUERY_MS
+
+    parser = argparse.ArgumentParser(description="Restaurant POS server")
+    commands = parser.add_subparsers(dest="command")
+
+    serve = commands.add_parser("serve", help="HTTP sunucusunu başlat (varsayılan)")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8000)
+    serve.add_argument(
+        "--mode",
+        choices=("threading", "asyncio"),
+        default=SERVER_MODE,
+        help="threading: istek başına thread; asyncio: HTTP/1.1 keep-alive + sınırlı iş havuzu",
+    )
+    serve.add_argument(
+        "--workers",
+        type=int,
+        default=WORKERS,
+        help="1'den büyükse bu kadar süreç SO_REUSEPORT ile aynı portu dinler (yalnızca Linux)",
+    )
+    serve.add_argument(
+        "--slow-query-ms",
+        type=float,
+        default=SLOW_QUERY_MS,
+        help="Bu süreyi aşan SQL ifadelerini plan ve tarama uyarılarıyla logla",
+    )
+
+    commands.add_parser("rebuild-rollups", help="Günlük rapor özetlerini geçmişten yeniden hesapla")
+
+    check_totals = commands.add_parser(
+        "check-totals", help="Kayıtlı sipariş toplamlarını tam yeniden hesaplama ile karşılaştır"
+    )
+    check_totals.add_argument("--fix", action="store_true", help="Tutarsız toplamları düzelt")
+
+    archive = commands.add_parser(
+        "archive", help="N günden önce kapanan siparişleri arşiv veritabanına taşı"
+    )
+    archive.add_argument("--days", type=int, required=True, help="Bu kadar günden eski kapanışlar taşınır")
+    archive.add_argument("--batch-size", type=int, default=ARCHIVE_BATCH_ORDERS, help="İşlem başına sipariş")
+    archive.add_argument("--vacuum", action="store_true", help="Taşımadan sonra canlı dosyayı küçült")
+
+    args = parser.parse_args(argv)
+    if args.command == "serve" and args.workers > 1 and not (
+        hasattr(os, "fork") and hasattr(socket, "SO_REUSEPORT")
+    ):
+        parser.error("--workers bu platformda desteklenmiyor (fork ve SO_REUSEPORT gerekli)")
+    if args.command == "rebuild-rollups":
+        rebuild_rollups_command()
+    elif args.command == "check-totals":
+        raise SystemExit(check_totals_command(args.fix))
+    elif args.command == "archive":
+        archive_command(args.days, args.batch_size, args.vacuum)
+    elif args.command == "serve":
+        SLOW_QUERY_MS = args.slow_query_ms
+        run_server(args.host, args.port, args.mode, args.workers)
+    else:
+        run_server()
 
 
 if __name__ == "__main__":
-    run_server()
+    main()
@@ -0,0 +1,449 @@
+#!/usr/bin/env python3
+import argparse
+import http.client
+import json
+import os
+import queue
+import random
+import signal
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from datetime import date
+from pathlib import Path
+
+APP_PATH = Path(__file__).resolve().parent.parent / "app.py"
+PAYMENT_METHODS = ["nakit", "kart", "qr", "yemek-karti"]
+SERVER_START_TIMEOUT = 15
+
+
+class Recorder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def record(self, route, seconds, status):
+        with self.lock:
+            self.samples[route].append(seconds)
+            if status is None or status >= 400:
+                self.errors[route] += 1
+
+
+class Client:
+    def __init__(self, host, port, recorder):
+        self.host = host
+        self.port = port
+        self.recorder = recorder
+        self.conn = http.client.HTTPConnection(host, port, timeout=30)
+
+    def request(self, method, path, route, body=None):
+        data = None
+        headers = {}
+        if body is not None:
+            data = json.dumps(body).encode("utf-8")
+            headers["Content-Type"] = "application/json"
+
+        start = time.perf_counter()
+        try:
+            self.conn.request(method, path, body=data, headers=headers)
+            response = self.conn.getresponse()
+            payload = response.read()
+        except (OSError, http.client.HTTPException):
+            self.conn.close()
+            self.recorder.record(route, time.perf_counter() - start, None)
+            return None
+        self.recorder.record(route, time.perf_counter() - start, response.status)
+
+        if response.status >= 400 or not payload:
+            return None
+        return json.loads(payload)
+
+    def close(self):
+        self.conn.close()
+
+
+def pause(rng, think_ms):
+    if think_ms > 0:
+        time.sleep(rng.uniform(0, 2 * think_ms) / 1000)
+
+
+def waiter(client, tables, menu_ids, bills, stop, rng, args):
+    # Each waiter owns a few tables; a table is reused only after a cashier
+    # has closed its previous order and set the table's event again.
+    while not stop.is_set():
+        free = [(table_id, ready) for table_id, ready in tables if ready.is_set()]
+        if not free:
+            tables[0][1].wait(0.1)
+            continue
+        table_id, ready = rng.choice(free)
+        ready.clear()
+
+        client.request("GET", "/api/tables", "GET /api/tables")
+        order = client.request("POST", "/api/orders", "POST /api/orders", {"table_id": table_id})
+        if order is None:
+            ready.set()
+            continue
+        order_id = order["id"]
+        pause(rng, args.think_ms)
+
+        client.request(
+            "POST",
+            f"/api/orders/{order_id}/items",
+            "POST /api/orders/{order_id}/items",
+            {"menu_item_id": rng.choice(menu_ids), "quantity": rng.randint(1, 3)},
+        )
+        pause(rng, args.think_ms)
+        client.request(
+            "POST",
+            f"/api/orders/{order_id}/items/batch",
+            "POST /api/orders/{order_id}/items/batch",
+            {
+                "items": [
+                    {"menu_item_id": rng.choice(menu_ids), "quantity": rng.randint(1, 2)}
+                    for _ in range(rng.randint(1, 4))
+                ]
+            },
+        )
+
+        items = []
+        while not stop.is_set():
+            pause(rng, args.poll_ms)
+            order = client.request("GET", f"/api/orders/{order_id}", "GET /api/orders/{order_id}")
+            if order is None:
+                continue
+            items = order["items"]
+            if all(item["status"] != "pending" for item in items):
+                break
+        if stop.is_set():
+            return
+
+        for item in items:
+            if item["status"] == "prepared":
+                client.request(
+                    "PATCH",
+                    f"/api/order-items/{item['id']}?view=delta",
+                    "PATCH /api/order-items/{item_id}",
+                    {"status": "served"},
+                )
+        bills.put((order_id, ready))
+
+
+def kitchen_screen(client, index, count, stop, rng, args):
+    while not stop.is_set():
+        tickets = client.request("GET", "/api/kitchen/tickets", "GET /api/kitchen/tickets") or []
+        for ticket in tickets:
+            if stop.is_set():
+                return
+            if ticket["id"] % count != index:
+                continue
+            pause(rng, args.think_ms)
+            client.request(
+                "PATCH",
+                f"/api/order-items/{ticket['id']}?view=delta",
+                "PATCH /api/order-items/{item_id}",
+                {"status": "prepared"},
+            )
+        pause(rng, args.poll_ms)
+
+
+def cashier(client, bills, stop, rng, args):
+    closed = 0
+    while not stop.is_set():
+        try:
+            order_id, ready = bills.get(timeout=0.1)
+        except queue.Empty:
+            continue
+        client.request("GET", f"/api/orders/{order_id}", "GET /api/orders/{order_id}")
+        pause(rng, args.think_ms)
+        order = client.request(
+            "POST",
+            f"/api/orders/{order_id}/close",
+            "POST /api/orders/{order_id}/close",
+            {"payment_method": rng.choice(PAYMENT_METHODS)},
+        )
+        ready.set()
+        if order is None:
+            continue
+
+        closed += 1
+        if closed % args.report_every == 0:
+            client.request("GET", "/api/orders/open", "GET /api/orders/open")
+            client.request(
+                "GET",
+                f"/api/reports/daily?date={date.today().isoformat()}",
+                "GET /api/reports/daily",
+            )
+
+
+def free_port(host):
+    with socket.socket() as sock:
+        sock.bind((host, 0))
+        return sock.getsockname()[1]
+
+
+def prepare_database(db_path, table_count, env):
+    # Any CLI command runs the migrations; check-totals has no side effects on a new database.
+    subprocess.run(
+        [sys.executable, str(APP_PATH), "check-totals"],
+        env=env,
+        check=True,
+        stdout=subprocess.DEVNULL,
+    )
+    conn = sqlite3.connect(db_path)
+    with conn:
+        existing = conn.execute("SELECT COUNT(*) FROM tables").fetchone()[0]
+        conn.executemany(
+            "INSERT INTO tables(name) VALUES (?)",
+            [(f"Masa {i}",) for i in range(existing + 1, table_count + 1)],
+        )
+    conn.close()
+
+
+def start_server(args, env, log_file):
+    proc = subprocess.Popen(
+        [
+            sys.executable,
+            str(APP_PATH),
+            "serve",
+            "--host",
+            args.host,
+            "--port",
+            str(args.port),
+            "--mode",
+            args.mode,
+            "--workers",
+            str(args.workers),
+        ],
+        env=env,
+        stdout=log_file,
+        stderr=subprocess.STDOUT,
+    )
+    deadline = time.monotonic() + SERVER_START_TIMEOUT
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"server exited with code {proc.returncode}")
+        try:
+            conn = http.client.HTTPConnection(args.host, args.port, timeout=1)
+            conn.request("GET", "/api/health")
+            conn.getresponse().read()
+            conn.close()
+            return proc
+        except OSError:
+            time.sleep(0.1)
+    proc.kill()
+    raise RuntimeError("server did not start in time")
+
+
+def stop_server(proc):
+    proc.send_signal(signal.SIGINT)
+    try:
+        proc.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        proc.wait()
+
+
+def percentile(sorted_values, fraction):
+    index = max(0, min(len(sorted_values) - 1, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def summarize(recorder, elapsed):
+    routes = {}
+    total_requests = 0
+    total_errors = 0
+    for route in sorted(recorder.samples):
+        samples = sorted(recorder.samples[route])
+        errors = recorder.errors[route]
+        total_requests += len(samples)
+        total_errors += errors
+        routes[route] = {
+            "requests": len(samples),
+            "errors": errors,
+            "error_rate": round(errors / len(samples), 4),
+            "throughput_rps": round(len(samples) / elapsed, 2),
+            "p50_ms": round(percentile(samples, 0.50) * 1000, 2),
+            "p95_ms": round(percentile(samples, 0.95) * 1000, 2),
+            "p99_ms": round(percentile(samples, 0.99) * 1000, 2),
+            "max_ms": round(samples[-1] * 1000, 2),
+        }
+    return {
+        "duration_s": round(elapsed, 2),
+        "requests": total_requests,
+        "errors": total_errors,
+        "error_rate": round(total_errors / total_requests, 4) if total_requests else 0.0,
+        "throughput_rps": round(total_requests / elapsed, 2),
+        "routes": routes,
+    }
+
+
+def print_report(results, baseline=None):
+    base_routes = baseline["routes"] if baseline else {}
+    print(f"{'route':44} {'req':>7} {'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'err%':>6}")
+    for route, stats in results["routes"].items():
+        line = (
+            f"{route:44} {stats['requests']:>7} {stats['throughput_rps']:>8.1f} "
+            f"{stats['p50_ms']:>8.2f} {stats['p95_ms']:>8.2f} {stats['p99_ms']:>8.2f} "
+            f"{stats['error_rate'] * 100:>6.2f}"
+        )
+        base = base_routes.get(route)
+        if base and base["p95_ms"]:
+            line += f"  p95 {(stats['p95_ms'] / base['p95_ms'] - 1) * 100:+.1f}%"
+        print(line)
+
+    summary = (
+        f"toplam: {results['requests']} istek, {results['throughput_rps']:.1f} istek/sn, "
+        f"hata oranı %{results['error_rate'] * 100:.2f}, "
+        f"tutarlı toplamlar: {'evet' if results['totals_consistent'] else 'HAYIR'}"
+    )
+    if baseline and baseline["throughput_rps"]:
+        summary += f" (baz çizgiye göre {(results['throughput_rps'] / baseline['throughput_rps'] - 1) * 100:+.1f}%)"
+    print(summary)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Geçici bir veritabanıyla app.py'yi başlatıp akşam servisi yükü uygular"
+    )
+    parser.add_argument("--waiters", type=int, default=8)
+    parser.add_argument("--kitchen-screens", type=int, default=2)
+    parser.add_argument("--cashiers", type=int, default=2)
+    parser.add_argument("--tables", type=int, default=32, help="Masa sayısı (garsonlara paylaştırılır)")
+    parser.add_argument("--duration", type=float, default=30, help="Saniye")
+    parser.add_argument("--think-ms", type=float, default=5, help="Ortalama kullanıcı bekleme süresi")
+    parser.add_argument("--poll-ms", type=float, default=50, help="Ortalama liste yoklama aralığı")
+    parser.add_argument("--report-every", type=int, default=10, help="Kasiyer her N kapanışta rapor çeker")
+    parser.add_argument("--mode", choices=("threading", "asyncio"), default="threading")
+    parser.add_argument("--workers", type=int, default=1, help="Sunucu süreç sayısı (serve --workers)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=0, help="0: boş bir port seç")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Sonuçların yazılacağı JSON dosyası")
+    parser.add_argument("--baseline", help="Karşılaştırma için önceki bir --output dosyası")
+    args = parser.parse_args()
+    if args.tables < args.waiters:
+        parser.error("--tables en az --waiters kadar olmalı")
+    return args
+
+
+def run_load(args, rng):
+    recorder = Recorder()
+    stop = threading.Event()
+    bills = queue.Queue()
+    clients = []
+
+    def client():
+        c = Client(args.host, args.port, recorder)
+        clients.append(c)
+        return c
+
+    setup = client()
+    menu_ids = [item["id"] for item in setup.request("GET", "/api/menu-items", "GET /api/menu-items")]
+    table_ids = [table["id"] for table in setup.request("GET", "/api/tables", "GET /api/tables")]
+
+    tables = [(table_id, threading.Event()) for table_id in table_ids]
+    for _, ready in tables:
+        ready.set()
+
+    workers = []
+    for index in range(args.waiters):
+        owned = tables[index :: args.waiters]
+        workers.append(
+            (waiter, (client(), owned, menu_ids, bills, stop, random.Random(rng.random()), args))
+        )
+    for index in range(args.kitchen_screens):
+        workers.append(
+            (
+                kitchen_screen,
+                (client(), index, args.kitchen_screens, stop, random.Random(rng.random()), args),
+            )
+        )
+    for _ in range(args.cashiers):
+        workers.append((cashier, (client(), bills, stop, random.Random(rng.random()), args)))
+
+    # Setup traffic is not part of the measured run.
+    recorder.samples.clear()
+    recorder.errors.clear()
+
+    threads = [threading.Thread(target=target, args=target_args, daemon=True) for target, target_args in workers]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    time.sleep(args.duration)
+    stop.set()
+    for thread in threads:
+        thread.join(timeout=30)
+    elapsed = time.perf_counter() - start
+
+    for c in clients:
+        c.close()
+    return summarize(recorder, elapsed)
+
+
+def main():
+    args = parse_args()
+    if args.port == 0:
+        args.port = free_port(args.host)
+    rng = random.Random(args.seed)
+
+    with tempfile.TemporaryDirectory(prefix="pos-load-") as tmp_dir:
+        db_path = os.path.join(tmp_dir, "restaurant.db")
+        env = dict(os.environ, POS_DB_PATH=db_path)
+        prepare_database(db_path, args.tables, env)
+
+        log_path = os.path.join(tmp_dir, "server.log")
+        with open(log_path, "wb") as log_file:
+            proc = start_server(args, env, log_file)
+            try:
+                results = run_load(args, rng)
+            finally:
+                stop_server(proc)
+
+        check = subprocess.run(
+            [sys.executable, str(APP_PATH), "check-totals"],
+            env=env,
+            stdout=subprocess.DEVNULL,
+        )
+        results["totals_consistent"] = check.returncode == 0
+
+        with open(log_path, "rb") as log_file:
+            server_errors = log_file.read().count(b"Traceback")
+        results["server_tracebacks"] = server_errors
+
+    results["config"] = {
+        key: getattr(args, key)
+        for key in (
+            "waiters",
+            "kitchen_screens",
+            "cashiers",
+            "tables",
+            "duration",
+            "think_ms",
+            "poll_ms",
+            "report_every",
+            "mode",
+            "workers",
+            "seed",
+        )
+    }
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_report(results, baseline)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"sonuçlar: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
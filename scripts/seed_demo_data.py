@@ -1,9 +1,13 @@
 #!/usr/bin/env python3
+import argparse
+import hashlib
 import json
 import os
 import random
+import time
 import urllib.parse
 import urllib.request
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta
 from pathlib import Path
 from urllib.parse import urlparse
@@ -13,6 +17,17 @@ import pg8000
 SEED_TAG = "DEMO_SEED_HOTELPOS_V1"
 ORDER_TAG = "DEMO_ORDER_SEED_HOTELPOS_V1"
 PAYMENT_TAG = "DEMO_PAYMENT_SEED_HOTELPOS_V1"
+SCALE_TAG = "SCALE_SEED_HOTELPOS_V1"
+
+# Rows per unnest() statement in scale mode; the arrays travel as one parameter each.
+BULK_BATCH_ROWS = 20000
+PAYMENT_METHODS = ["nakit", "kart", "havale", "diger"]
+
+MEAL_SEARCH_URL = "https://www.themealdb.com/api/json/v1/1/search.php"
+DRINK_SEARCH_URL = "https://www.thecocktaildb.com/api/json/v1/1/search.php"
+DEFAULT_IMAGE_URL = "https://www.themealdb.com/images/media/meals/1548772327.jpg"
+IMAGE_CACHE_PATH = Path(__file__).resolve().parent / ".image_cache.json"
+IMAGE_LOOKUP_WORKERS = 8
 
 MENU_ITEMS = [
     # Restoran
@@ -93,9 +108,9 @@ def fetch_json(url: str):
         return json.loads(resp.read().decode("utf-8"))
 
 
-def meal_image(query: str):
+def meal_image(query: str, search_url: str = MEAL_SEARCH_URL):
     q = urllib.parse.quote(query)
-    url = f"https://www.themealdb.com/api/json/v1/1/search.php?s={q}"
+    url = f"{search_url}?s={q}"
     data = fetch_json(url)
     meals = data.get("meals") or []
     if meals:
@@ -103,9 +118,9 @@ def meal_image(query: str):
     return None
 
 
-def drink_image(query: str):
+def drink_image(query: str, search_url: str = DRINK_SEARCH_URL):
     q = urllib.parse.quote(query)
-    url = f"https://www.thecocktaildb.com/api/json/v1/1/search.php?s={q}"
+    url = f"{search_url}?s={q}"
     data = fetch_json(url)
     drinks = data.get("drinks") or []
     if drinks:
@@ -113,18 +128,78 @@ def drink_image(query: str):
     return None
 
 
-def resolve_image(item):
-    try:
+def image_key(item):
+    return f"{item['source']}:{item['query']}"
+
+
+class NetworkImageResolver:
+    """Looks images up on themealdb/thecocktaildb, or on stand-ins serving the same API."""
+
+    def __init__(self, meal_url=MEAL_SEARCH_URL, drink_url=DRINK_SEARCH_URL):
+        self.meal_url = meal_url
+        self.drink_url = drink_url
+
+    def cache_path(self, path):
+        """Stand-in APIs get their own cache file next to ``path`` so they never mix with real lookups."""
+        path = Path(path)
+        if (self.meal_url, self.drink_url) == (MEAL_SEARCH_URL, DRINK_SEARCH_URL):
+            return path
+        digest = hashlib.sha1(f"{self.meal_url}\n{self.drink_url}".encode("utf-8")).hexdigest()[:10]
+        return path.with_name(f"{path.stem}.{digest}{path.suffix}")
+
+    def __call__(self, item):
         if item["source"] == "meal":
-            img = meal_image(item["query"])
-        else:
-            img = drink_image(item["query"])
-        if img:
-            return img
-    except Exception:
-        pass
+            return meal_image(item["query"], self.meal_url)
+        return drink_image(item["query"], self.drink_url)
+
+
+class FixtureImageResolver:
+    """Reads images from a JSON file shaped like the cache: {"meal:burger": url, ...}."""
 
-    return "https://www.themealdb.com/images/media/meals/1548772327.jpg"
+    def __init__(self, path):
+        self.images = json.loads(Path(path).read_text(encoding="utf-8"))
+
+    def __call__(self, item):
+        return self.images.get(image_key(item))
+
+
+def load_image_cache(path):
+    try:
+        return json.loads(Path(path).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def save_image_cache(path, cache):
+    path = Path(path)
+    tmp_path = path.with_name(path.name + ".tmp")
+    tmp_path.write_text(json.dumps(cache, ensure_ascii=False, indent=2, sort_keys=True), encoding="utf-8")
+    os.replace(tmp_path, path)
+
+
+def resolve_images(items, resolver, cache_path=None, workers=IMAGE_LOOKUP_WORKERS):
+    """Return {image_key: url} for items.
+
+    Keys missing from the cache are looked up concurrently, each query once.
+    "No match" answers are cached too. Lookups that raise are left out, so
+    they are retried on the next run. Anything without an image gets
+    DEFAULT_IMAGE_URL.
+    """
+    cache = load_image_cache(cache_path) if cache_path else {}
+    pending = {image_key(item): item for item in items if image_key(item) not in cache}
+
+    if resolver is not None and pending:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(resolver, item): key for key, item in pending.items()}
+            for future in as_completed(futures):
+                try:
+                    cache[futures[future]] = future.result()
+                except Exception:
+                    pass
+        if cache_path:
+            save_image_cache(cache_path, cache)
+
+    return {image_key(item): cache.get(image_key(item)) or DEFAULT_IMAGE_URL for item in items}
 
 
 def ensure_schema(conn):
@@ -136,7 +211,7 @@ def ensure_schema(conn):
     cur.close()
 
 
-def seed_menu(conn):
+def seed_menu(conn, image_urls):
     cur = conn.cursor()
 
     cur.execute("select id, name from public.outlets")
@@ -146,7 +221,7 @@ def seed_menu(conn):
     updated = 0
     for item in MENU_ITEMS:
         outlet_id = outlets[item["outlet"]]
-        image_url = resolve_image(item)
+        image_url = image_urls[image_key(item)]
 
         cur.execute(
             """
@@ -179,30 +254,75 @@ def seed_menu(conn):
     return inserted, updated
 
 
-def ensure_room(cur, room_number):
-    cur.execute("select id from public.rooms where room_number = %s", (room_number,))
-    row = cur.fetchone()
-    if row:
-        return row[0]
+def bulk_insert(cur, table, columns, types, rows, returning=None):
+    """Insert rows with one `insert ... select from unnest(...)` per BULK_BATCH_ROWS rows."""
+    returned = []
+    arrays = ", ".join(f"%s::{t}[]" for t in types)
+    sql = f"insert into {table} ({', '.join(columns)}) select * from unnest({arrays})"
+    if returning:
+        sql += f" returning {returning}"
+
+    for start in range(0, len(rows), BULK_BATCH_ROWS):
+        batch = rows[start:start + BULK_BATCH_ROWS]
+        cur.execute(sql, [list(column) for column in zip(*batch)])
+        if returning:
+            returned.extend(cur.fetchall())
+    return returned
+
 
+def upsert_rooms(cur, room_numbers):
+    """Return {room_number: id}, inserting missing rooms, in one statement."""
+    # Rows inserted by the CTE are not visible to the second SELECT, so the
+    # union returns every room exactly once.
     cur.execute(
-        "insert into public.rooms (room_number, is_active) values (%s, true) returning id",
-        (room_number,),
+        """
+        with input as (
+            select distinct room_number from unnest(%s::text[]) as t(room_number)
+        ),
+        inserted as (
+            insert into public.rooms (room_number, is_active)
+            select room_number, true from input
+            on conflict (room_number) do nothing
+            returning room_number, id
+        )
+        select room_number, id from inserted
+        union all
+        select r.room_number, r.id from public.rooms r join input using (room_number)
+        """,
+        (list(room_numbers),),
     )
-    return cur.fetchone()[0]
-
+    return dict(cur.fetchall())
 
-def ensure_guest(cur, full_name, phone):
-    cur.execute("select id from public.guests where full_name = %s", (full_name,))
-    row = cur.fetchone()
-    if row:
-        return row[0]
 
+def upsert_guests(cur, guests):
+    """Return {full_name: id} for (full_name, phone) pairs, inserting unknown names, in one statement."""
+    # guests.full_name is not unique; an existing guest with the name is reused
+    # (the oldest one if there are several).
     cur.execute(
-        "insert into public.guests (full_name, phone) values (%s, %s) returning id",
-        (full_name, phone),
+        """
+        with input as (
+            select distinct on (full_name) full_name, phone
+            from unnest(%s::text[], %s::text[]) as t(full_name, phone)
+            order by full_name
+        ),
+        existing as (
+            select distinct on (g.full_name) g.full_name, g.id
+            from public.guests g join input using (full_name)
+            order by g.full_name, g.id
+        ),
+        inserted as (
+            insert into public.guests (full_name, phone)
+            select i.full_name, i.phone from input i
+            where not exists (select 1 from existing e where e.full_name = i.full_name)
+            returning full_name, id
+        )
+        select full_name, id from existing
+        union all
+        select full_name, id from inserted
+        """,
+        ([name for name, _ in guests], [phone for _, phone in guests]),
     )
-    return cur.fetchone()[0]
+    return dict(cur.fetchall())
 
 
 def seed_stays(conn):
@@ -210,21 +330,29 @@ def seed_stays(conn):
     created = 0
 
     now = datetime.utcnow()
-    stay_ids = []
 
-    for i, name in enumerate(GUEST_NAMES, start=1):
-        room_number = str(200 + i)
-        phone = f"0555{7000000 + i}"
+    guests = [
+        (str(200 + i), f"Demo {name}", f"0555{7000000 + i}")
+        for i, name in enumerate(GUEST_NAMES, start=1)
+    ]
+    room_ids = upsert_rooms(cur, [room_number for room_number, _, _ in guests])
+    guest_ids = upsert_guests(cur, [(full_name, phone) for _, full_name, phone in guests])
 
-        room_id = ensure_room(cur, room_number)
-        guest_id = ensure_guest(cur, f"Demo {name}", phone)
-
-        note = f"{SEED_TAG}:{room_number}"
-        cur.execute("select id, status from public.stays where note = %s limit 1", (note,))
-        row = cur.fetchone()
+    notes = [f"{SEED_TAG}:{room_number}" for room_number, _, _ in guests]
+    cur.execute(
+        """
+        select distinct on (note) note, id, status
+        from public.stays
+        where note = any(%s)
+        order by note, id
+        """,
+        (notes,),
+    )
+    existing = {note: (stay_id, status) for note, stay_id, status in cur.fetchall()}
 
-        if row:
-            stay_ids.append((row[0], row[1]))
+    new_stays = []
+    for i, ((room_number, full_name, _), note) in enumerate(zip(guests, notes), start=1):
+        if note in existing:
             continue
 
         check_in = now - timedelta(days=random.randint(0, 4), hours=random.randint(1, 18))
@@ -233,19 +361,23 @@ def seed_stays(conn):
         status = "open" if i <= 10 else "closed"
         closed_at = (check_in + timedelta(hours=random.randint(5, 22))) if status == "closed" else None
 
-        cur.execute(
-            """
-            insert into public.stays
-              (guest_id, room_id, check_in, check_out_plan, status, note, closed_at)
-            values
-              (%s, %s, %s, %s, %s, %s, %s)
-            returning id
-            """,
-            (guest_id, room_id, check_in, planned, status, note, closed_at),
+        new_stays.append(
+            (guest_ids[full_name], room_ids[room_number], check_in, planned, status, note, closed_at)
         )
-        stay_ids.append((cur.fetchone()[0], status))
+
+    for stay_id, note, status in bulk_insert(
+        cur,
+        "public.stays",
+        ["guest_id", "room_id", "check_in", "check_out_plan", "status", "note", "closed_at"],
+        ["bigint", "bigint", "timestamptz", "timestamptz", "text", "text", "timestamptz"],
+        new_stays,
+        returning="id, note, status",
+    ):
+        existing[note] = (stay_id, status)
         created += 1
 
+    stay_ids = [existing[note] for note in notes]
+
     conn.commit()
     cur.close()
     return stay_ids, created
@@ -352,7 +484,6 @@ def seed_payments(conn, stay_ids):
         cur.close()
         return 0
 
-    methods = ["nakit", "kart", "havale", "diger"]
     payment_count = 0
 
     for stay_id, status in stay_ids:
@@ -393,7 +524,7 @@ def seed_payments(conn, stay_ids):
                 """,
                 (
                     stay_id,
-                    random.choice(methods),
+                    random.choice(PAYMENT_METHODS),
                     amount,
                     f"{PAYMENT_TAG}:{stay_id}:{idx}",
                     datetime.utcnow() - timedelta(hours=random.randint(1, 48)),
@@ -406,7 +537,245 @@ def seed_payments(conn, stay_ids):
     return payment_count
 
 
+def generate_scale_stays(stay_count, days, room_count, now):
+    start = now - timedelta(days=days)
+    stays = []
+    for i in range(1, stay_count + 1):
+        check_in = start + timedelta(minutes=random.randint(0, days * 24 * 60))
+        nights = random.randint(1, 5)
+        planned = check_in + timedelta(days=nights)
+        closed = planned < now
+        stays.append(
+            {
+                "guest_name": f"{random.choice(GUEST_NAMES)} {i}",
+                "phone": f"0599{i:07d}",
+                "room_number": str(1000 + random.randint(1, room_count)),
+                "check_in": check_in,
+                "planned": planned,
+                "status": "closed" if closed else "open",
+                "closed_at": planned + timedelta(hours=random.randint(0, 4)) if closed else None,
+                "note": f"{SCALE_TAG}:stay:{i}",
+                "charges": 0.0,
+            }
+        )
+    return stays
+
+
+def generate_scale_orders(stays, days, now, outlet_ids, menu_by_outlet):
+    orders = []
+    items = []
+
+    def add_order(stay, created_at):
+        outlet_id = random.choice(outlet_ids)
+        available = menu_by_outlet.get(outlet_id)
+        if not available:
+            return
+        order_index = len(orders)
+        orders.append((stay, outlet_id, f"{SCALE_TAG}:order:{order_index}", created_at))
+        for _ in range(random.randint(1, 5)):
+            item_id, name, price = random.choice(available)
+            quantity = random.randint(1, 3)
+            items.append((order_index, item_id, name, quantity, price, created_at))
+            if stay is not None:
+                stay["charges"] += quantity * price
+
+    for stay in stays:
+        end = stay["closed_at"] or now
+        window = max(int((end - stay["check_in"]).total_seconds()), 60)
+        for _ in range(random.randint(0, 4)):
+            add_order(stay, stay["check_in"] + timedelta(seconds=random.randint(0, window)))
+
+    # Walk-in guests, spread over the whole period.
+    for _ in range(len(stays) // 4):
+        add_order(None, now - timedelta(minutes=random.randint(0, days * 24 * 60)))
+
+    return orders, items
+
+
+def ensure_history_partitions(cur, since):
+    """Create monthly partitions back to since when sql/partitioning.sql has been applied.
+
+    Without them a backdated bulk load lands entirely in the *_default partitions.
+    """
+    cur.execute("select to_regprocedure('public.ensure_monthly_partitions(integer, timestamptz)') is not null")
+    if cur.fetchone()[0]:
+        cur.execute("select public.ensure_monthly_partitions(2, %s::timestamptz)", (since,))
+
+
+def seed_scale(conn, stay_count, days, room_count):
+    cur = conn.cursor()
+
+    cur.execute("select count(*) from public.stays where note like %s", (f"{SCALE_TAG}%",))
+    if cur.fetchone()[0] > 0:
+        cur.close()
+        return {"stays": 0, "orders": 0, "order_items": 0, "payments": 0}
+
+    cur.execute("select id from public.outlets order by id")
+    outlet_ids = [r[0] for r in cur.fetchall()]
+    cur.execute(
+        "select id, outlet_id, name, price from public.menu_items where is_active = true order by id"
+    )
+    menu_by_outlet = {}
+    for item_id, outlet_id, name, price in cur.fetchall():
+        menu_by_outlet.setdefault(outlet_id, []).append((item_id, name, float(price)))
+
+    now = datetime.utcnow()
+    stays = generate_scale_stays(stay_count, days, room_count, now)
+    orders, items = generate_scale_orders(stays, days, now, outlet_ids, menu_by_outlet)
+
+    # A day of slack for payments dated a little before check-out.
+    ensure_history_partitions(cur, now - timedelta(days=days + 1))
+    conn.commit()
+
+    # 1) Rooms, guests and stays in one transaction. Generated ids are mapped
+    # back through a unique column of each row, never through row order.
+    room_ids = upsert_rooms(cur, sorted({stay["room_number"] for stay in stays}))
+
+    guest_ids = dict(
+        (phone, guest_id)
+        for guest_id, phone in bulk_insert(
+            cur,
+            "public.guests",
+            ["full_name", "phone"],
+            ["text", "text"],
+            [(stay["guest_name"], stay["phone"]) for stay in stays],
+            returning="id, phone",
+        )
+    )
+    stay_ids = dict(
+        (note, stay_id)
+        for stay_id, note in bulk_insert(
+            cur,
+            "public.stays",
+            ["guest_id", "room_id", "check_in", "check_out_plan", "status", "note", "closed_at"],
+            ["bigint", "bigint", "timestamptz", "timestamptz", "text", "text", "timestamptz"],
+            [
+                (
+                    guest_ids[stay["phone"]],
+                    room_ids[stay["room_number"]],
+                    stay["check_in"],
+                    stay["planned"],
+                    stay["status"],
+                    stay["note"],
+                    stay["closed_at"],
+                )
+                for stay in stays
+            ],
+            returning="id, note",
+        )
+    )
+    for stay in stays:
+        stay["id"] = stay_ids[stay["note"]]
+    conn.commit()
+
+    # 2) Orders, then their lines once the order ids are known.
+    order_ids = dict(
+        (note, order_id)
+        for order_id, note in bulk_insert(
+            cur,
+            "public.orders",
+            ["stay_id", "outlet_id", "order_source", "status", "note", "created_at"],
+            ["bigint", "bigint", "text", "text", "text", "timestamptz"],
+            [
+                (stay["id"] if stay else None, outlet_id, "pos", "closed", note, created_at)
+                for stay, outlet_id, note, created_at in orders
+            ],
+            returning="id, note",
+        )
+    )
+    bulk_insert(
+        cur,
+        "public.order_items",
+        ["order_id", "menu_item_id", "item_name", "quantity", "unit_price", "created_at"],
+        ["bigint", "bigint", "text", "int", "numeric", "timestamptz"],
+        [
+            (order_ids[orders[order_index][2]], item_id, name, quantity, price, created_at)
+            for order_index, item_id, name, quantity, price, created_at in items
+        ],
+    )
+    conn.commit()
+
+    # 3) Payments from the charges summed while generating, not one query per stay.
+    payments = []
+    for stay in stays:
+        if stay["charges"] <= 0:
+            continue
+        ratio = 1.0 if stay["status"] == "closed" else random.uniform(0.35, 0.85)
+        pay_total = round(stay["charges"] * ratio, 2)
+        paid_at = stay["closed_at"] or now
+        split = 1 if pay_total < 300 else random.choice([1, 2])
+        remain = pay_total
+        for idx in range(split):
+            if idx == split - 1:
+                amount = round(remain, 2)
+            else:
+                amount = round(pay_total * random.uniform(0.35, 0.65), 2)
+                remain = round(remain - amount, 2)
+            if amount <= 0:
+                continue
+            payments.append(
+                (
+                    stay["id"],
+                    random.choice(PAYMENT_METHODS),
+                    amount,
+                    f"{SCALE_TAG}:payment:{stay['id']}:{idx}",
+                    paid_at - timedelta(minutes=random.randint(0, 120)),
+                )
+            )
+    bulk_insert(
+        cur,
+        "public.payments",
+        ["stay_id", "method", "amount", "note", "created_at"],
+        ["bigint", "text", "numeric", "text", "timestamptz"],
+        payments,
+    )
+    conn.commit()
+    cur.close()
+
+    return {
+        "stays": len(stays),
+        "orders": len(orders),
+        "order_items": len(items),
+        "payments": len(payments),
+    }
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Hotel POS demo verisi")
+    parser.add_argument(
+        "--stays",
+        type=int,
+        help="Olcek modu: bu kadar sentetik konaklama ve ilgili siparis/odemeleri toplu yukle",
+    )
+    parser.add_argument("--days", type=int, default=365, help="Olcek modunda kapsanan gun sayisi")
+    parser.add_argument("--rooms", type=int, default=150, help="Olcek modunda oda sayisi")
+    parser.add_argument(
+        "--images",
+        choices=("network", "fixture", "off"),
+        default="network",
+        help="network: web API + disk onbellegi, fixture: JSON dosyasi, off: varsayilan gorsel",
+    )
+    parser.add_argument("--image-fixture", help="--images fixture icin JSON dosyasi (onbellek formatinda)")
+    parser.add_argument("--image-cache", default=str(IMAGE_CACHE_PATH), help="Gorsel arama onbellegi")
+    parser.add_argument("--meal-api", default=MEAL_SEARCH_URL, help="themealdb arama adresi (yerel stub icin)")
+    parser.add_argument("--drink-api", default=DRINK_SEARCH_URL, help="thecocktaildb arama adresi (yerel stub icin)")
+    args = parser.parse_args()
+    if args.images == "fixture" and not args.image_fixture:
+        parser.error("--images fixture icin --image-fixture gerekli")
+    return args
+
+
+def menu_image_urls(args):
+    if args.images == "off":
+        return resolve_images(MENU_ITEMS, None)
+    if args.images == "fixture":
+        return resolve_images(MENU_ITEMS, FixtureImageResolver(args.image_fixture))
+    resolver = NetworkImageResolver(args.meal_api, args.drink_api)
+    return resolve_images(MENU_ITEMS, resolver, cache_path=resolver.cache_path(args.image_cache))
+
+
 def main():
+    args = parse_args()
     random.seed(42)
 
     db_params = parse_database_url()
@@ -420,7 +789,21 @@ def main():
     )
 
     ensure_schema(conn)
-    menu_inserted, menu_updated = seed_menu(conn)
+    menu_inserted, menu_updated = seed_menu(conn, menu_image_urls(args))
+
+    if args.stays:
+        started = time.perf_counter()
+        counts = seed_scale(conn, args.stays, args.days, args.rooms)
+        conn.close()
+
+        print("seed_ok")
+        print(f"menu_inserted={menu_inserted}")
+        print(f"menu_updated={menu_updated}")
+        for name, count in counts.items():
+            print(f"scale_{name}_created={count}")
+        print(f"scale_seconds={time.perf_counter() - started:.1f}")
+        return
+
     stay_ids, stays_created = seed_stays(conn)
     orders_created, order_items_created = seed_orders_and_items(conn, stay_ids)
     payments_created = seed_payments(conn, stay_ids)
@@ -94,6 +94,13 @@ create table if not exists public.payment_audit_logs (
   created_at timestamptz not null default now()
 );
 
+create table if not exists public.stay_balances (
+  stay_id bigint primary key constraint stay_balances_stay_id_fkey references public.stays(id) on delete cascade,
+  charge_total numeric(12,2) not null default 0,
+  payment_total numeric(12,2) not null default 0,
+  updated_at timestamptz not null default now()
+);
+
 create table if not exists public.staff_users (
   id bigint generated always as identity primary key,
   username text not null unique,
@@ -106,8 +113,11 @@ create table if not exists public.staff_users (
 
 create index if not exists idx_stays_status on public.stays(status);
 create index if not exists idx_orders_stay on public.orders(stay_id);
+create index if not exists idx_orders_created_at on public.orders(created_at);
+create index if not exists idx_orders_outlet_created_at on public.orders(outlet_id, created_at);
 create index if not exists idx_order_items_order on public.order_items(order_id);
 create index if not exists idx_payments_stay on public.payments(stay_id);
+create index if not exists idx_payments_created_at on public.payments(created_at);
 create index if not exists idx_payment_audit_logs_stay on public.payment_audit_logs(stay_id);
 create index if not exists idx_payment_audit_logs_payment on public.payment_audit_logs(payment_id);
 create index if not exists idx_staff_users_username on public.staff_users(username);
@@ -128,13 +138,14 @@ alter table if exists public.payments
 
 do $$
 begin
+  -- After sql/partitioning.sql this reference is enforced by a trigger instead.
   if not exists (
     select 1
     from information_schema.table_constraints
     where table_schema = 'public'
       and table_name = 'payments'
       and constraint_name = 'payments_reference_payment_id_fkey'
-  ) then
+  ) and (select relkind from pg_class where oid = 'public.payments'::regclass) <> 'p' then
     alter table public.payments
       add constraint payments_reference_payment_id_fkey
       foreign key (reference_payment_id) references public.payments(id);
@@ -153,6 +164,267 @@ begin
   end if;
 end $$;
 
+-- stay_balances is maintained incrementally so v_stay_balance never aggregates history.
+-- Deltas are applied with "total = total + delta" so concurrent writers to the same stay
+-- serialize on the balance row instead of overwriting each other's recompute.
+create or replace function public.stay_balances_add(p_stay_id bigint, p_charge numeric, p_payment numeric)
+returns void
+language sql
+security definer
+set search_path = public
+as $$
+  insert into public.stay_balances as b (stay_id, charge_total, payment_total)
+  values (p_stay_id, p_charge, p_payment)
+  on conflict (stay_id) do update
+  set charge_total = b.charge_total + excluded.charge_total,
+      payment_total = b.payment_total + excluded.payment_total,
+      updated_at = now();
+$$;
+
+create or replace function public.stay_balances_on_stay_insert()
+returns trigger
+language plpgsql
+security definer
+set search_path = public
+as $$
+begin
+  insert into public.stay_balances(stay_id)
+  select id from new_rows
+  on conflict (stay_id) do nothing;
+  return null;
+end;
+$$;
+
+-- Line deltas are resolved to stays through orders; lines whose order is already gone
+-- (cascade from an order delete) are skipped because the order trigger accounted for them.
+create or replace function public.stay_balances_on_order_items()
+returns trigger
+language plpgsql
+security definer
+set search_path = public
+as $$
+begin
+  if tg_op in ('INSERT', 'UPDATE') then
+    perform public.stay_balances_add(d.stay_id, d.amount, 0)
+    from (
+      select o.stay_id, sum(n.quantity * n.unit_price) as amount
+      from new_rows n
+      join public.orders o on o.id = n.order_id
+      where o.stay_id is not null
+      group by o.stay_id
+      order by o.stay_id
+    ) d;
+  end if;
+
+  if tg_op in ('UPDATE', 'DELETE') then
+    perform public.stay_balances_add(d.stay_id, -d.amount, 0)
+    from (
+      select o.stay_id, sum(od.quantity * od.unit_price) as amount
+      from old_rows od
+      join public.orders o on o.id = od.order_id
+      where o.stay_id is not null
+      group by o.stay_id
+      order by o.stay_id
+    ) d;
+  end if;
+
+  return null;
+end;
+$$;
+
+-- Runs before delete (and before the order_items cascade) so the lines are still visible.
+create or replace function public.stay_balances_on_order_delete()
+returns trigger
+language plpgsql
+security definer
+set search_path = public
+as $$
+begin
+  if old.stay_id is not null then
+    perform public.stay_balances_add(
+      old.stay_id,
+      -coalesce((select sum(quantity * unit_price) from public.order_items where order_id = old.id), 0),
+      0
+    );
+  end if;
+  return old;
+end;
+$$;
+
+create or replace function public.stay_balances_on_order_move()
+returns trigger
+language plpgsql
+security definer
+set search_path = public
+as $$
+declare
+  v_total numeric;
+begin
+  select coalesce(sum(quantity * unit_price), 0) into v_total
+  from public.order_items
+  where order_id = new.id;
+
+  if old.stay_id is not null then
+    perform public.stay_balances_add(old.stay_id, -v_total, 0);
+  end if;
+  if new.stay_id is not null then
+    perform public.stay_balances_add(new.stay_id, v_total, 0);
+  end if;
+  return null;
+end;
+$$;
+
+-- Reversals and adjustments are signed rows in payments, so a plain sum covers them.
+create or replace function public.stay_balances_on_payments()
+returns trigger
+language plpgsql
+security definer
+set search_path = public
+as $$
+begin
+  if tg_op in ('INSERT', 'UPDATE') then
+    perform public.stay_balances_add(d.stay_id, 0, d.amount)
+    from (
+      select stay_id, sum(amount) as amount
+      from new_rows
+      group by stay_id
+      order by stay_id
+    ) d;
+  end if;
+
+  if tg_op in ('UPDATE', 'DELETE') then
+    perform public.stay_balances_add(d.stay_id, 0, -d.amount)
+    from (
+      select stay_id, sum(amount) as amount
+      from old_rows
+      group by stay_id
+      order by stay_id
+    ) d;
+  end if;
+
+  return null;
+end;
+$$;
+
+drop trigger if exists trg_stay_balances_stay_insert on public.stays;
+create trigger trg_stay_balances_stay_insert
+after insert on public.stays
+referencing new table as new_rows
+for each statement execute function public.stay_balances_on_stay_insert();
+
+drop trigger if exists trg_stay_balances_order_items_insert on public.order_items;
+create trigger trg_stay_balances_order_items_insert
+after insert on public.order_items
+referencing new table as new_rows
+for each statement execute function public.stay_balances_on_order_items();
+
+drop trigger if exists trg_stay_balances_order_items_update on public.order_items;
+create trigger trg_stay_balances_order_items_update
+after update on public.order_items
+referencing old table as old_rows new table as new_rows
+for each statement execute function public.stay_balances_on_order_items();
+
+drop trigger if exists trg_stay_balances_order_items_delete on public.order_items;
+create trigger trg_stay_balances_order_items_delete
+after delete on public.order_items
+referencing old table as old_rows
+for each statement execute function public.stay_balances_on_order_items();
+
+drop trigger if exists trg_stay_balances_order_delete on public.orders;
+create trigger trg_stay_balances_order_delete
+before delete on public.orders
+for each row execute function public.stay_balances_on_order_delete();
+
+drop trigger if exists trg_stay_balances_order_move on public.orders;
+create trigger trg_stay_balances_order_move
+after update of stay_id on public.orders
+for each row
+when (old.stay_id is distinct from new.stay_id)
+execute function public.stay_balances_on_order_move();
+
+drop trigger if exists trg_stay_balances_payments_insert on public.payments;
+create trigger trg_stay_balances_payments_insert
+after insert on public.payments
+referencing new table as new_rows
+for each statement execute function public.stay_balances_on_payments();
+
+drop trigger if exists trg_stay_balances_payments_update on public.payments;
+create trigger trg_stay_balances_payments_update
+after update on public.payments
+referencing old table as old_rows new table as new_rows
+for each statement execute function public.stay_balances_on_payments();
+
+drop trigger if exists trg_stay_balances_payments_delete on public.payments;
+create trigger trg_stay_balances_payments_delete
+after delete on public.payments
+referencing old table as old_rows
+for each statement execute function public.stay_balances_on_payments();
+
+-- Compares stay_balances with a full recompute and returns the drifted stays.
+-- With p_fix => true the drifted rows are overwritten (this also backfills missing rows);
+-- run the fix outside busy hours, a recompute racing live writes can store a stale total.
+create or replace function public.reconcile_stay_balances(p_fix boolean default false)
+returns table (
+  stay_id bigint,
+  stored_charge_total numeric,
+  actual_charge_total numeric,
+  stored_payment_total numeric,
+  actual_payment_total numeric
+)
+language sql
+security definer
+set search_path = public
+as $$
+  with actual as (
+    select
+      s.id,
+      coalesce(ch.total, 0)::numeric(12,2) as charge_total,
+      coalesce(py.total, 0)::numeric(12,2) as payment_total
+    from public.stays s
+    left join (
+      select o.stay_id, sum(oi.quantity * oi.unit_price) as total
+      from public.orders o
+      join public.order_items oi on oi.order_id = o.id
+      where o.stay_id is not null
+      group by o.stay_id
+    ) ch on ch.stay_id = s.id
+    left join (
+      select p.stay_id, sum(p.amount) as total
+      from public.payments p
+      group by p.stay_id
+    ) py on py.stay_id = s.id
+  ),
+  drift as (
+    select a.id, b.charge_total as stored_charge, a.charge_total, b.payment_total as stored_payment, a.payment_total
+    from actual a
+    left join public.stay_balances b on b.stay_id = a.id
+    where b.stay_id is null
+       or b.charge_total <> a.charge_total
+       or b.payment_total <> a.payment_total
+  ),
+  fixed as (
+    insert into public.stay_balances as b (stay_id, charge_total, payment_total)
+    select d.id, d.charge_total, d.payment_total
+    from drift d
+    where p_fix
+    on conflict on constraint stay_balances_pkey do update
+    set charge_total = excluded.charge_total,
+        payment_total = excluded.payment_total,
+        updated_at = now()
+  )
+  select d.id, d.stored_charge, d.charge_total, d.stored_payment, d.payment_total
+  from drift d;
+$$;
+
+do $$
+begin
+  -- One-time backfill the first time stay_balances is created on a database that already has stays;
+  -- after that the triggers keep it current and reconcile_stay_balances() is a manual maintenance call.
+  if not exists (select 1 from public.stay_balances) and exists (select 1 from public.stays) then
+    perform public.reconcile_stay_balances(true);
+  end if;
+end $$;
+
 insert into public.outlets(name)
 values ('Restoran'), ('Bar')
 on conflict (name) do nothing;
@@ -177,32 +449,227 @@ select
   coalesce(sum(oi.quantity * oi.unit_price), 0)::numeric(12,2) as total
 from public.orders o
 left join public.order_items oi on oi.order_id = o.id
-group by o.id;
+group by o.id, o.created_at;
 
 create or replace view public.v_stay_balance as
 select
   s.id as stay_id,
   s.status,
-  coalesce(ch.charge_total, 0)::numeric(12,2) as charge_total,
-  coalesce(py.payment_total, 0)::numeric(12,2) as payment_total,
-  (coalesce(ch.charge_total, 0) - coalesce(py.payment_total, 0))::numeric(12,2) as balance
+  coalesce(b.charge_total, 0)::numeric(12,2) as charge_total,
+  coalesce(b.payment_total, 0)::numeric(12,2) as payment_total,
+  (coalesce(b.charge_total, 0) - coalesce(b.payment_total, 0))::numeric(12,2) as balance
 from public.stays s
-left join (
-  select stay_id, sum(total) as charge_total
-  from public.v_order_totals
-  where stay_id is not null
-  group by stay_id
-) ch on ch.stay_id = s.id
-left join (
-  select stay_id, sum(amount) as payment_total
-  from public.payments
-  group by stay_id
-) py on py.stay_id = s.id;
+left join public.stay_balances b on b.stay_id = s.id;
+
+-- Whole checkout folio in one round trip; every lookup is keyed by stay_id/order_id indexes.
+create or replace function public.get_stay_folio(p_stay_id bigint)
+returns jsonb
+language sql
+stable
+set search_path = public
+as $$
+  select jsonb_build_object(
+    'stay', jsonb_build_object(
+      'id', s.id,
+      'status', s.status,
+      'check_in', s.check_in,
+      'check_out_plan', s.check_out_plan,
+      'closed_at', s.closed_at,
+      'note', s.note
+    ),
+    'guest', jsonb_build_object('id', g.id, 'full_name', g.full_name, 'phone', g.phone),
+    'room', jsonb_build_object('id', r.id, 'room_number', r.room_number),
+    'orders', coalesce((
+      select jsonb_agg(
+        jsonb_build_object(
+          'id', o.id,
+          'created_at', o.created_at,
+          'outlet_id', o.outlet_id,
+          'outlet_name', ot.name,
+          'status', o.status,
+          'note', o.note,
+          'total', li.total,
+          'items', li.items
+        )
+        order by o.created_at desc, o.id desc
+      )
+      from public.orders o
+      left join public.outlets ot on ot.id = o.outlet_id
+      cross join lateral (
+        select
+          coalesce(sum(oi.quantity * oi.unit_price), 0)::numeric(12,2) as total,
+          coalesce(
+            jsonb_agg(
+              jsonb_build_object(
+                'id', oi.id,
+                'menu_item_id', oi.menu_item_id,
+                'item_name', oi.item_name,
+                'quantity', oi.quantity,
+                'unit_price', oi.unit_price
+              )
+              order by oi.id
+            ),
+            '[]'::jsonb
+          ) as items
+        from public.order_items oi
+        where oi.order_id = o.id
+      ) li
+      where o.stay_id = s.id
+    ), '[]'::jsonb),
+    'payments', coalesce((
+      select jsonb_agg(
+        jsonb_build_object(
+          'id', p.id,
+          'method', p.method,
+          'amount', p.amount,
+          'entry_type', p.entry_type,
+          'reference_payment_id', p.reference_payment_id,
+          'note', p.note,
+          'created_at', p.created_at
+        )
+        order by p.created_at desc, p.id desc
+      )
+      from public.payments p
+      where p.stay_id = s.id
+    ), '[]'::jsonb),
+    'balance', jsonb_build_object(
+      'charge_total', coalesce(b.charge_total, 0),
+      'payment_total', coalesce(b.payment_total, 0),
+      'balance', coalesce(b.charge_total, 0) - coalesce(b.payment_total, 0)
+    )
+  )
+  from public.stays s
+  join public.guests g on g.id = s.guest_id
+  join public.rooms r on r.id = s.room_id
+  left join public.stay_balances b on b.stay_id = s.id
+  where s.id = p_stay_id;
+$$;
+
+-- Daily report for [p_from, p_to): sales, collections, outlet split, payment split,
+-- top room charges and top open receivables, aggregated server-side.
+create or replace function public.get_daily_report(p_from timestamptz, p_to timestamptz)
+returns jsonb
+language sql
+stable
+set search_path = public
+as $$
+  with report_orders as (
+    select
+      o.id,
+      o.stay_id,
+      o.outlet_id,
+      coalesce((
+        select sum(oi.quantity * oi.unit_price)
+        from public.order_items oi
+        where oi.order_id = o.id
+      ), 0) as total
+    from public.orders o
+    where o.created_at >= p_from
+      and o.created_at < p_to
+      and o.status <> 'cancelled'
+  ),
+  report_payments as (
+    select p.method, count(*) as entry_count, sum(p.amount) as total
+    from public.payments p
+    where p.created_at >= p_from
+      and p.created_at < p_to
+    group by p.method
+  ),
+  totals as (
+    select
+      (select count(*) from report_orders) as order_count,
+      (select count(*) from report_orders where stay_id is not null) as room_order_count,
+      (select count(*) from report_orders where stay_id is null) as walkin_order_count,
+      (select coalesce(sum(total), 0) from report_orders) as gross_sales,
+      (select coalesce(sum(total), 0) from report_payments) as payment_total
+  )
+  select jsonb_build_object(
+    'summary', (
+      select jsonb_build_object(
+        'order_count', t.order_count,
+        'room_order_count', t.room_order_count,
+        'walkin_order_count', t.walkin_order_count,
+        'gross_sales', t.gross_sales,
+        'payment_total', t.payment_total,
+        'net', t.gross_sales - t.payment_total
+      )
+      from totals t
+    ),
+    'by_outlet', coalesce((
+      select jsonb_agg(
+        jsonb_build_object('name', x.name, 'order_count', x.order_count, 'total', x.total)
+        order by x.total desc
+      )
+      from (
+        select coalesce(ot.name, '-') as name, count(*) as order_count, sum(ro.total) as total
+        from report_orders ro
+        left join public.outlets ot on ot.id = ro.outlet_id
+        group by coalesce(ot.name, '-')
+      ) x
+    ), '[]'::jsonb),
+    'by_payment', coalesce((
+      select jsonb_agg(
+        jsonb_build_object('method', rp.method, 'count', rp.entry_count, 'total', rp.total)
+        order by rp.total desc
+      )
+      from report_payments rp
+    ), '[]'::jsonb),
+    'by_room', coalesce((
+      select jsonb_agg(
+        jsonb_build_object('stay_id', x.stay_id, 'room_number', x.room_number, 'guest_name', x.guest_name, 'total', x.total)
+        order by x.total desc
+      )
+      from (
+        select t.stay_id, r.room_number, g.full_name as guest_name, t.total
+        from (
+          select ro.stay_id, sum(ro.total) as total
+          from report_orders ro
+          where ro.stay_id is not null
+          group by ro.stay_id
+          order by total desc
+          limit 10
+        ) t
+        join public.stays s on s.id = t.stay_id
+        join public.rooms r on r.id = s.room_id
+        join public.guests g on g.id = s.guest_id
+      ) x
+    ), '[]'::jsonb),
+    'open_balances', coalesce((
+      select jsonb_agg(
+        jsonb_build_object('stay_id', x.stay_id, 'room_number', x.room_number, 'guest_name', x.guest_name, 'balance', x.balance)
+        order by x.balance desc
+      )
+      from (
+        select t.stay_id, r.room_number, g.full_name as guest_name, t.balance
+        from (
+          -- Scalar lookup keeps this driven by the open stays instead of scanning every balance row.
+          select o.stay_id, o.room_id, o.guest_id, o.balance
+          from (
+            select
+              s.id as stay_id,
+              s.room_id,
+              s.guest_id,
+              (select b.charge_total - b.payment_total from public.stay_balances b where b.stay_id = s.id) as balance
+            from public.stays s
+            where s.status = 'open'
+          ) o
+          where o.balance > 0
+          order by o.balance desc
+          limit 10
+        ) t
+        join public.rooms r on r.id = t.room_id
+        join public.guests g on g.id = t.guest_id
+      ) x
+    ), '[]'::jsonb)
+  );
+$$;
 
 grant usage on schema public to anon, authenticated;
 grant select, insert, update, delete on all tables in schema public to anon, authenticated;
 grant usage, select on all sequences in schema public to anon, authenticated;
 grant select on public.v_order_totals, public.v_stay_balance to anon, authenticated;
+grant execute on function public.get_stay_folio(bigint) to anon, authenticated;
+grant execute on function public.get_daily_report(timestamptz, timestamptz) to anon, authenticated;
 
 alter table public.outlets enable row level security;
 alter table public.rooms enable row level security;
@@ -214,6 +681,7 @@ alter table public.order_items enable row level security;
 alter table public.payments enable row level security;
 alter table public.payment_audit_logs enable row level security;
 alter table public.staff_users enable row level security;
+alter table public.stay_balances enable row level security;
 
 do $$
 begin
@@ -276,4 +744,11 @@ begin
   ) then
     create policy demo_all_staff_users on public.staff_users for all to anon, authenticated using (true) with check (true);
   end if;
+
+  -- Read-only for clients: rows are written by the security definer trigger functions.
+  if not exists (
+    select 1 from pg_policies where schemaname = 'public' and tablename = 'stay_balances' and policyname = 'demo_read_stay_balances'
+  ) then
+    create policy demo_read_stay_balances on public.stay_balances for select to anon, authenticated using (true);
+  end if;
 end $$;
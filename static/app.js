@@ -684,61 +684,20 @@ async function loadCheckoutForStay(stayId) {
     return;
   }
 
-  const ordersRes = await db
-    .from("orders")
-    .select("id,created_at,outlet_id")
-    .eq("stay_id", stayId)
-    .order("created_at", { ascending: false });
-
-  const orders = must(ordersRes.data, ordersRes.error, "Folio siparişleri alınamadı");
-  const orderIds = orders.map((o) => o.id);
-
-  const [itemsRes, outletsRes, paymentsRes] = await Promise.all([
-    orderIds.length
-      ? db
-          .from("order_items")
-          .select("order_id,item_name,quantity,unit_price")
-          .in("order_id", orderIds)
-      : Promise.resolve({ data: [], error: null }),
-    db.from("outlets").select("id,name"),
-    db
-      .from("payments")
-      .select("id,method,amount,note,created_at")
-      .eq("stay_id", stayId)
-      .order("created_at", { ascending: false }),
-  ]);
-
-  const items = must(itemsRes.data, itemsRes.error, "Sipariş kalemleri alınamadı");
-  const outlets = must(outletsRes.data, outletsRes.error, "Outletler alınamadı");
-  const payments = must(paymentsRes.data, paymentsRes.error, "Ödemeler alınamadı");
-
-  const outletMap = new Map(outlets.map((o) => [o.id, o.name]));
-  const itemsByOrder = new Map();
-  items.forEach((i) => {
-    if (!itemsByOrder.has(i.order_id)) itemsByOrder.set(i.order_id, []);
-    itemsByOrder.get(i.order_id).push(i);
-  });
-
-  const preparedOrders = orders.map((o) => {
-    const orderItems = itemsByOrder.get(o.id) || [];
-    const total = orderItems.reduce((sum, i) => sum + Number(i.quantity) * Number(i.unit_price), 0);
-    return {
-      ...o,
-      outlet_name: outletMap.get(o.outlet_id) || "-",
-      items: orderItems,
-      total,
-    };
-  });
-
-  const chargeTotal = preparedOrders.reduce((sum, o) => sum + o.total, 0);
-  const paymentTotal = payments.reduce((sum, p) => sum + Number(p.amount), 0);
+  const folioRes = await db.rpc("get_stay_folio", { p_stay_id: stayId });
+  const folio = must(folioRes.data, folioRes.error, "Folio alınamadı");
+  if (!folio) throw new Error("Konaklama bulunamadı.");
 
-  state.checkout.orders = preparedOrders;
-  state.checkout.payments = payments;
+  state.checkout.orders = folio.orders.map((o) => ({
+    ...o,
+    outlet_name: o.outlet_name || "-",
+    total: Number(o.total),
+  }));
+  state.checkout.payments = folio.payments;
   state.checkout.totals = {
-    charges: chargeTotal,
-    payments: paymentTotal,
-    balance: chargeTotal - paymentTotal,
+    charges: Number(folio.balance.charge_total),
+    payments: Number(folio.balance.payment_total),
+    balance: Number(folio.balance.balance),
   };
 
   renderCheckoutView();
@@ -746,7 +705,8 @@ async function loadCheckoutForStay(stayId) {
 
 function dateRangeIso(dateStr) {
   const start = new Date(`${dateStr}T00:00:00`);
-  const end = new Date(`${dateStr}T23:59:59.999`);
+  const end = new Date(start);
+  end.setDate(end.getDate() + 1);
   return [start.toISOString(), end.toISOString()];
 }
 
@@ -756,156 +716,39 @@ async function loadDailyReport(dateStr) {
   const [startIso, endIso] = dateRangeIso(dateStr);
   state.report.date = dateStr;
 
-  const ordersRes = await db
-    .from("orders")
-    .select("id,created_at,stay_id,outlet_id,status")
-    .gte("created_at", startIso)
-    .lte("created_at", endIso)
-    .neq("status", "cancelled")
-    .order("created_at", { ascending: false });
-
-  const paymentsRes = await db
-    .from("payments")
-    .select("method,amount")
-    .gte("created_at", startIso)
-    .lte("created_at", endIso);
-
-  const outletsRes = await db.from("outlets").select("id,name");
-
-  const orders = must(ordersRes.data, ordersRes.error, "Rapor siparişleri alınamadı");
-  const payments = must(paymentsRes.data, paymentsRes.error, "Rapor ödemeleri alınamadı");
-  const outlets = must(outletsRes.data, outletsRes.error, "Outletler alınamadı");
-
-  const orderIds = orders.map((o) => o.id);
-  const stayIds = [...new Set(orders.map((o) => o.stay_id).filter(Boolean))];
-
-  const [itemsRes, staysRes, openBalancesRes] = await Promise.all([
-    orderIds.length
-      ? db
-          .from("order_items")
-          .select("order_id,quantity,unit_price")
-          .in("order_id", orderIds)
-      : Promise.resolve({ data: [], error: null }),
-    stayIds.length
-      ? db
-          .from("stays")
-          .select(`
-            id,
-            room:rooms!stays_room_id_fkey(room_number),
-            guest:guests!stays_guest_id_fkey(full_name)
-          `)
-          .in("id", stayIds)
-      : Promise.resolve({ data: [], error: null }),
-    db
-      .from("v_stay_balance")
-      .select("stay_id,balance,status")
-      .eq("status", "open")
-      .gt("balance", 0),
-  ]);
-
-  const items = must(itemsRes.data, itemsRes.error, "Rapor kalemleri alınamadı");
-  const stays = must(staysRes.data, staysRes.error, "Rapor oda bilgisi alınamadı");
-  const openBalances = must(openBalancesRes.data, openBalancesRes.error, "Açık bakiyeler alınamadı");
-
-  const orderTotalMap = new Map();
-  items.forEach((i) => {
-    const current = orderTotalMap.get(i.order_id) || 0;
-    orderTotalMap.set(i.order_id, current + Number(i.quantity) * Number(i.unit_price));
-  });
-
-  const outletMap = new Map(outlets.map((o) => [o.id, o.name]));
-  const stayMap = new Map(
-    stays.map((s) => [
-      s.id,
-      {
-        roomNumber: s.room?.room_number || "-",
-        guestName: s.guest?.full_name || "-",
-      },
-    ])
-  );
-
-  const byOutletMap = new Map();
-  const byRoomMap = new Map();
-
-  let grossSales = 0;
-  let roomOrderCount = 0;
-  let walkinOrderCount = 0;
-
-  orders.forEach((o) => {
-    const total = orderTotalMap.get(o.id) || 0;
-    grossSales += total;
-
-    const outletName = outletMap.get(o.outlet_id) || "-";
-    const existingOutlet = byOutletMap.get(outletName) || { name: outletName, orderCount: 0, total: 0 };
-    existingOutlet.orderCount += 1;
-    existingOutlet.total += total;
-    byOutletMap.set(outletName, existingOutlet);
-
-    if (o.stay_id) {
-      roomOrderCount += 1;
-      const stayInfo = stayMap.get(o.stay_id) || { roomNumber: "-", guestName: "-" };
-      const key = String(o.stay_id);
-      const existingRoom = byRoomMap.get(key) || {
-        roomNumber: stayInfo.roomNumber,
-        guestName: stayInfo.guestName,
-        total: 0,
-      };
-      existingRoom.total += total;
-      byRoomMap.set(key, existingRoom);
-    } else {
-      walkinOrderCount += 1;
-    }
-  });
-
-  const byPaymentMap = new Map();
-  let paymentTotal = 0;
-  payments.forEach((p) => {
-    const method = p.method || "diger";
-    const current = byPaymentMap.get(method) || { method, count: 0, total: 0 };
-    current.count += 1;
-    current.total += Number(p.amount || 0);
-    byPaymentMap.set(method, current);
-    paymentTotal += Number(p.amount || 0);
-  });
-
-  const openStayIds = openBalances.map((b) => b.stay_id);
-  let openStayInfoMap = new Map();
-  if (openStayIds.length) {
-    const openStaysRes = await db
-      .from("stays")
-      .select(`
-        id,
-        room:rooms!stays_room_id_fkey(room_number),
-        guest:guests!stays_guest_id_fkey(full_name)
-      `)
-      .in("id", openStayIds);
-
-    const openStays = must(openStaysRes.data, openStaysRes.error, "Açık oda bilgisi alınamadı");
-    openStayInfoMap = new Map(
-      openStays.map((s) => [s.id, { roomNumber: s.room?.room_number || "-", guestName: s.guest?.full_name || "-" }])
-    );
-  }
+  const reportRes = await db.rpc("get_daily_report", { p_from: startIso, p_to: endIso });
+  const report = must(reportRes.data, reportRes.error, "Rapor alınamadı");
+  const s = report.summary;
 
   state.report.summary = {
-    orderCount: orders.length,
-    roomOrderCount,
-    walkinOrderCount,
-    grossSales,
-    paymentTotal,
-    net: grossSales - paymentTotal,
+    orderCount: Number(s.order_count),
+    roomOrderCount: Number(s.room_order_count),
+    walkinOrderCount: Number(s.walkin_order_count),
+    grossSales: Number(s.gross_sales),
+    paymentTotal: Number(s.payment_total),
+    net: Number(s.net),
   };
 
-  state.report.byOutlet = [...byOutletMap.values()].sort((a, b) => b.total - a.total);
-  state.report.byPayment = [...byPaymentMap.values()].sort((a, b) => b.total - a.total);
-  state.report.byRoom = [...byRoomMap.values()].sort((a, b) => b.total - a.total).slice(0, 10);
-  state.report.openBalances = openBalances
-    .map((x) => ({
-      roomNumber: openStayInfoMap.get(x.stay_id)?.roomNumber || "-",
-      guestName: openStayInfoMap.get(x.stay_id)?.guestName || "-",
-      balance: Number(x.balance || 0),
-    }))
-    .sort((a, b) => b.balance - a.balance)
-    .slice(0, 10);
+  state.report.byOutlet = report.by_outlet.map((x) => ({
+    name: x.name,
+    orderCount: Number(x.order_count),
+    total: Number(x.total),
+  }));
+  state.report.byPayment = report.by_payment.map((x) => ({
+    method: x.method,
+    count: Number(x.count),
+    total: Number(x.total),
+  }));
+  state.report.byRoom = report.by_room.map((x) => ({
+    roomNumber: x.room_number || "-",
+    guestName: x.guest_name || "-",
+    total: Number(x.total),
+  }));
+  state.report.openBalances = report.open_balances.map((x) => ({
+    roomNumber: x.room_number || "-",
+    guestName: x.guest_name || "-",
+    balance: Number(x.balance),
+  }));
 
   renderReport();
 }
@@ -0,0 +1,125 @@
+import json
+import os
+import sqlite3
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+os.environ.setdefault("POS_DB_PATH", os.path.join(tempfile.mkdtemp(prefix="pos-test-"), "restaurant.db"))
+
+import app  # noqa: E402
+
+# The first row comes back straight away; the remaining VM steps only run
+# while the cursor is being fetched.
+LAZY_SLOW_SQL = """
+    WITH RECURSIVE n(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM n WHERE x < 300000)
+    SELECT x FROM n WHERE x = 1 OR x = 300000
+"""
+
+
+def pooled_connection(slow_query_hooks=False):
+    conn = sqlite3.connect(":memory:", factory=app.PooledConnection, check_same_thread=False)
+    if slow_query_hooks:
+        conn.enable_slow_query_hooks()
+    return conn
+
+
+class SlowQueryLogTests(unittest.TestCase):
+    def test_slow_query_is_logged_when_time_is_spent_fetching(self):
+        conn = pooled_connection(slow_query_hooks=True)
+        self.addCleanup(conn.close)
+        with mock.patch.object(app, "SLOW_QUERY_MS", 20.0), self.assertLogs("pos.slow_query", "WARNING") as logs:
+            rows = conn.execute(LAZY_SLOW_SQL).fetchall()
+
+        self.assertEqual([tuple(row) for row in rows], [(1,), (300000,)])
+        self.assertEqual(len(logs.records), 1)
+        record = json.loads(logs.records[0].getMessage().split(" ", 2)[2])
+        self.assertGreaterEqual(record["duration_ms"], 20.0)
+        self.assertGreater(record["vm_steps"], 0)
+        self.assertIn("x < 300000", record["sql"])
+
+    def test_fast_query_is_not_logged(self):
+        conn = pooled_connection(slow_query_hooks=True)
+        self.addCleanup(conn.close)
+        with mock.patch.object(app, "SLOW_QUERY_MS", 1000.0), mock.patch.object(app.SLOW_QUERIES, "report") as report:
+            conn.execute("SELECT 1").fetchall()
+        report.assert_not_called()
+
+    def test_plan_flags(self):
+        self.assertEqual(app.SlowQueryLog.plan_flags(["SCAN orders"]), ["full-scan:orders"])
+        self.assertEqual(app.SlowQueryLog.plan_flags(["SCAN orders USING INDEX idx_orders_closed_at"]), [])
+        self.assertEqual(app.SlowQueryLog.plan_flags(["SCAN TABLE orders AS o"]), ["full-scan:orders"])
+
+    def test_plan_flags_function_wrapped_columns(self):
+        flags = app.SlowQueryLog.plan_flags(
+            [], "SELECT id FROM orders o WHERE date(o.closed_at) = ? AND lower(status) LIKE ? AND date(?) = ?"
+        )
+        self.assertEqual(flags, ["function-on-column:date(o.closed_at)", "function-on-column:lower(status)"])
+        self.assertEqual(
+            app.SlowQueryLog.plan_flags([], "SELECT COUNT(id) AS n FROM orders GROUP BY table_id HAVING count(id) > 1"),
+            [],
+        )
+
+
+class QueryMetricsTests(unittest.TestCase):
+    def setUp(self):
+        app._request_context.handler = self.id()
+        self.addCleanup(delattr, app._request_context, "handler")
+
+    def test_query_histogram_matches_wall_clock(self):
+        conn = pooled_connection()
+        self.addCleanup(conn.close)
+        start = time.perf_counter()
+        conn.execute(LAZY_SLOW_SQL).fetchall()
+        wall = time.perf_counter() - start
+
+        histogram = app.METRICS._queries[self.id()]
+        self.assertEqual(histogram.count, 1)
+        self.assertLessEqual(histogram.total, wall)
+        self.assertGreater(histogram.total, wall * 0.9)
+
+    def test_unconsumed_cursor_is_recorded_when_collected(self):
+        conn = pooled_connection()
+        self.addCleanup(conn.close)
+        self.assertEqual(tuple(conn.execute(LAZY_SLOW_SQL).fetchone()), (1,))
+        self.assertEqual(app.METRICS._queries[self.id()].count, 1)
+
+
+class RouterTests(unittest.TestCase):
+    def setUp(self):
+        self.router = app.Router()
+        self.router.add("GET", "/api/tables", "list_tables")
+        self.router.add("POST", "/api/orders/{order_id:int}/items", "add_item")
+
+    def test_literal_route_ignores_trailing_slash(self):
+        for path in ("/api/tables", "/api/tables/"):
+            route, params, allowed = self.router.resolve("GET", path)
+            self.assertEqual((route.handler, params, allowed), ("list_tables", [], ()), path)
+
+    def test_parameterised_route_ignores_trailing_slash(self):
+        for path in ("/api/orders/7/items", "/api/orders/7/items/"):
+            route, params, allowed = self.router.resolve("POST", path)
+            self.assertEqual((route.handler, params, allowed), ("add_item", [7], ()), path)
+
+    def test_trailing_slash_keeps_405_and_404(self):
+        self.assertEqual(self.router.resolve("GET", "/api/orders/7/items/"), (None, None, ("POST",)))
+        self.assertEqual(self.router.resolve("GET", "/api/orders/x/items/"), (None, None, ()))
+
+
+class StaticAssetCacheTests(unittest.TestCase):
+    def setUp(self):
+        self.assets = app.StaticAssetCache(app.STATIC_DIR)
+        self.assets.load()
+
+    def test_percent_encoded_paths_are_decoded(self):
+        self.assertIs(self.assets.get("/styles%2Ecss"), self.assets.get("/styles.css"))
+        self.assertIsNotNone(self.assets.get("/styles.css"))
+
+    def test_encoded_traversal_is_rejected(self):
+        for path in ("/../app.py", "/%2e%2e/app.py", "/%2E%2E%2Fapp.py", "/.%2Findex.html", "/%5C..%5Capp.py"):
+            self.assertIsNone(self.assets.get(path), path)
+
+
+if __name__ == "__main__":
+    unittest.main()